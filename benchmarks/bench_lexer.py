@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Lexer Benchmarks
+
+Times RegexEngine construction and matching on pathological patterns and
+Tokenizer.tokenize on generated sources, reporting throughput and peak
+memory. Results can be saved as JSON and compared against a previous run
+to catch regressions.
+
+Usage:
+    python benchmarks/bench_lexer.py
+    python benchmarks/bench_lexer.py --sizes 1K 1M 50M
+    python benchmarks/bench_lexer.py --save baseline.json
+    python benchmarks/bench_lexer.py --compare baseline.json --tolerance 0.2
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from lexer import RegexEngine  # noqa: E402
+from compiler.compiler import create_tokenizer  # noqa: E402
+
+REGEX_MODES = ("dfa", "lazy", "nfa")
+
+# name -> (regex, input generator)
+PATHOLOGICAL_PATTERNS = {
+    "nested_stars": ("((a*)*(b*)*)*c", lambda n: "ab" * (n // 2)),
+    "large_charset": ("[ -~]+", lambda n: "".join(chr(32 + i % 95) for i in range(n))),
+    "long_alternation": (
+        "(" + "|".join(f"kw{i}x" for i in range(200)) + ")+",
+        lambda n: "".join(f"kw{i % 200}x" for i in range(n // 5)),
+    ),
+    "exponential_dfa": ("(a|b)*a(a|b)(a|b)(a|b)(a|b)(a|b)(a|b)", lambda n: "ab" * (n // 2)),
+}
+
+
+def parse_size(text):
+    units = {"K": 1024, "M": 1024 * 1024}
+    if text[-1].upper() in units:
+        return int(float(text[:-1]) * units[text[-1].upper()])
+    return int(text)
+
+
+def generate_source(size, seed=0):
+    # Lexically valid program text of roughly size bytes
+    rnd = random.Random(seed)
+    lines = ["{"]
+    length = 2
+    counter = 0
+    while length < size:
+        counter += 1
+        kind = rnd.random()
+        if kind < 0.4:
+            line = f"    var int v{counter} = {rnd.randint(0, 9999)} + v{counter - 1} * -{rnd.randint(1, 99)};"
+        elif kind < 0.6:
+            line = f"    print((v{counter // 2} - {rnd.randint(0, 99)}) / 7);"
+        elif kind < 0.8:
+            line = f"    while (v{counter} <= {rnd.randint(0, 99)}) & (flag == true) do {{ v{counter} = v{counter} + 1; }}"
+        else:
+            line = f"\tif v{counter} != {rnd.randint(0, 99)} do {{ var bool b{counter} = false; }}"
+        lines.append(line)
+        length += len(line) + 1
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def best_time(function, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_regex(input_size, repeat):
+    results = {}
+    for name, (regex, make_input) in PATHOLOGICAL_PATTERNS.items():
+        text = make_input(input_size)
+        for mode in REGEX_MODES:
+            build_time, engine = best_time(lambda: RegexEngine(regex, mode=mode), repeat)
+            match_time, _ = best_time(lambda: engine.find_longest_match(text), repeat)
+            results[f"regex/{name}/{mode}"] = {
+                "build_ms": build_time * 1000,
+                "match_chars_per_sec": len(text) / match_time if match_time else 0.0,
+            }
+    return results
+
+
+def bench_tokenizer(sizes, repeat):
+    results = {}
+    tokenizer = create_tokenizer()
+    tokenizer.matcher.compile()
+    for size in sizes:
+        source = generate_source(size)
+        elapsed, tokens = best_time(lambda: tokenizer.tokenize(source), repeat)
+        buffer_elapsed, _ = best_time(lambda: tokenizer.tokenize_buffer(source), repeat)
+        stream_elapsed, _ = best_time(
+            lambda: sum(1 for _ in tokenizer.tokenize_stream(io.StringIO(source))), repeat
+        )
+        results[f"tokenize/{size}"] = {
+            "bytes": len(source),
+            "tokens": len(tokens),
+            "tokens_per_sec": len(tokens) / elapsed,
+            "mb_per_sec": len(source) / elapsed / 1e6,
+            "buffer_tokens_per_sec": len(tokens) / buffer_elapsed,
+            "stream_tokens_per_sec": len(tokens) / stream_elapsed,
+            "peak_memory_mb": peak_memory(lambda: tokenizer.tokenize(source)) / 1e6,
+            "buffer_peak_memory_mb": peak_memory(lambda: tokenizer.tokenize_buffer(source)) / 1e6,
+        }
+        del tokens
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # Flags every throughput metric that dropped by more than tolerance
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            if not metric.endswith("_per_sec"):
+                continue
+            previous = baseline.get(name, {}).get(metric)
+            if previous and value < previous * (1 - tolerance):
+                regressions.append(f"{name} {metric}: {previous:,.0f} -> {value:,.0f}")
+    return regressions
+
+
+def print_results(results):
+    for name, metrics in results.items():
+        values = ", ".join(
+            f"{metric}={value:,.2f}" if isinstance(value, float) else f"{metric}={value:,}"
+            for metric, value in metrics.items()
+        )
+        print(f"{name:40} {values}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lexer benchmarks")
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        default=["1K", "64K", "1M"],
+        help="Generated source sizes for the tokenizer, e.g. 1K 1M 50M (default: 1K 64K 1M)",
+    )
+    parser.add_argument(
+        "--regex-input", default="20K", help="Input size for regex matching (default: 20K)"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, best is kept")
+    parser.add_argument("--skip-regex", action="store_true", help="Only benchmark the tokenizer")
+    parser.add_argument("--save", help="Write results to a JSON file")
+    parser.add_argument("--compare", help="Compare against results saved with --save")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="Allowed throughput drop when comparing (default: 0.15)",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    if not args.skip_regex:
+        results.update(bench_regex(parse_size(args.regex_input), args.repeat))
+    results.update(bench_tokenizer([parse_size(size) for size in args.sizes], args.repeat))
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Parser Benchmarks
+
+Times each parser on generated sources and reports the size of the AST it
+builds: node count, bytes per node for the node objects themselves, and
+bytes per node retained by the whole tree (including lexeme strings).
+
+Usage:
+    python benchmarks/bench_parser.py
+    python benchmarks/bench_parser.py --sizes 64K 4M --save parser.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench_lexer import parse_size, generate_source, best_time, print_results  # noqa: E402
+from compiler.compiler import create_tokenizer, PARSERS  # noqa: E402
+
+NODE_MODULE = "parser.parserNodes"
+
+
+def ast_nodes(root):
+    # Every node of the tree rooted at root
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        for name in node_fields(node):
+            value = getattr(node, name, None)
+            for child in value if isinstance(value, list) else (value,):
+                if type(child).__module__ == NODE_MODULE:
+                    stack.append(child)
+    return nodes
+
+
+def node_fields(node):
+    if hasattr(node, "__dict__"):
+        return list(vars(node))
+    return type(node).__slots__
+
+
+def node_bytes(node):
+    size = sys.getsizeof(node)
+    if hasattr(node, "__dict__"):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+
+def bench_parsers(sizes, repeat):
+    results = {}
+    tokenizer = create_tokenizer()
+    for size in sizes:
+        source = generate_source(size)
+        tokens = tokenizer.tokenize_buffer(source)
+        for mode, parser_class in sorted(PARSERS.items()):
+            elapsed, ast = best_time(lambda: parser_class(tokens).parse_program(), repeat)
+            nodes = ast_nodes(ast)
+            del ast
+            tracemalloc.start()
+            ast = parser_class(tokens).parse_program()
+            retained = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del ast
+            results[f"parse/{mode}/{size}"] = {
+                "nodes": len(nodes),
+                "nodes_per_sec": len(nodes) / elapsed,
+                "node_bytes_per_node": sum(node_bytes(node) for node in nodes) / len(nodes),
+                "retained_bytes_per_node": retained / len(nodes),
+            }
+            del nodes
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser benchmarks")
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        default=["64K", "1M"],
+        help="Generated source sizes, e.g. 64K 4M (default: 64K 1M)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, best is kept")
+    parser.add_argument("--save", help="Write results to a JSON file")
+    args = parser.parse_args()
+
+    results = bench_parsers([parse_size(size) for size in args.sizes], args.repeat)
+    print_results(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
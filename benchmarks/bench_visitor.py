@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Visitor Dispatch Benchmarks
+
+Measures the per-node cost of dispatching AST nodes to visit methods, with
+the Visitor base class's per-class dispatch table ("table") against building
+the method name and calling getattr on every node ("name"). Both a walk that
+does nothing but dispatch and the real analysis and TAC generation passes are
+timed on generated sources.
+
+Usage:
+    python benchmarks/bench_visitor.py
+    python benchmarks/bench_visitor.py --sizes 64K 1M --save visitor.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench_lexer import parse_size, best_time, print_results  # noqa: E402
+from bench_parser import ast_nodes  # noqa: E402
+from compiler.compiler import create_tokenizer  # noqa: E402
+from parser import Parser  # noqa: E402
+from analyzer import SemanticAnalyzer  # noqa: E402
+from codegen import TACGenerator  # noqa: E402
+from utils import Visitor  # noqa: E402
+
+
+def generate_program(size, seed=0):
+    # Semantically valid program text of roughly size bytes; variables are
+    # only used once they are defined
+    rnd = random.Random(seed)
+    lines = ["{", "    var int v0 = 1;", "    var bool flag = true;"]
+    length = sum(len(line) + 1 for line in lines) + 1
+    defined = ["v0"]
+    counter = 0
+    while length < size:
+        counter += 1
+        kind = rnd.random()
+        var = rnd.choice(defined)
+        if kind < 0.4:
+            line = f"    var int v{counter} = {rnd.randint(0, 9999)} + {var} * -{rnd.randint(1, 99)};"
+            defined.append(f"v{counter}")
+        elif kind < 0.6:
+            line = f"    print(({var} - {rnd.randint(0, 99)}) / 7);"
+        elif kind < 0.8:
+            line = f"    while ({var} <= {rnd.randint(0, 99)}) & (flag == true) do {{ {var} = {var} + 1; }}"
+        else:
+            line = f"\tif {var} != {rnd.randint(0, 99)} do {{ var bool b{counter} = false; }}"
+        lines.append(line)
+        length += len(line) + 1
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def name_dispatch(self, node):
+    # Dispatch as the walkers did before Visitor
+    method_name = f"visit_{type(node).__name__}"
+    visitor = getattr(self, method_name, self.generic_visit)
+    return visitor(node)
+
+
+class TableWalk(Visitor):
+    # Visits every node and does nothing else
+    def visit_ProgramNode(self, node):
+        self.visit(node.scope)
+
+    def visit_ScopeNode(self, node):
+        for statement in node.statements:
+            self.visit(statement)
+
+    def visit_DefinerNode(self, node):
+        if node.value:
+            self.visit(node.value)
+
+    def visit_EqualizeNode(self, node):
+        self.visit(node.value)
+
+    def visit_IfNode(self, node):
+        self.visit(node.condition)
+        self.visit(node.scope)
+
+    visit_WhileNode = visit_IfNode
+
+    def visit_PrintNode(self, node):
+        self.visit(node.expression)
+
+    def visit_ConditionNode(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+
+    visit_ExpressionNode = visit_ConditionNode
+    visit_TermNode = visit_ConditionNode
+
+    def visit_FactorNode(self, node):
+        pass
+
+
+class NameWalk(TableWalk):
+    visit = name_dispatch
+
+
+class NameAnalyzer(SemanticAnalyzer):
+    visit = name_dispatch
+
+
+class NameTACGenerator(TACGenerator):
+    visit = name_dispatch
+    generate = name_dispatch
+
+
+PASSES = {
+    "walk": {
+        "table": lambda ast: TableWalk().visit(ast),
+        "name": lambda ast: NameWalk().visit(ast),
+    },
+    "analyze": {
+        "table": lambda ast: SemanticAnalyzer().analyze(ast),
+        "name": lambda ast: NameAnalyzer().analyze(ast),
+    },
+    "tac": {
+        "table": lambda ast: TACGenerator().generate_tac(ast),
+        "name": lambda ast: NameTACGenerator().generate_tac(ast),
+    },
+}
+
+
+def bench_visitors(sizes, repeat):
+    results = {}
+    tokenizer = create_tokenizer()
+    for size in sizes:
+        ast = Parser(tokenizer.tokenize_buffer(generate_program(size))).parse_program()
+        nodes = len(ast_nodes(ast))
+        for name, modes in PASSES.items():
+            times = {}
+            for mode, run in modes.items():
+                # The passes allocate a lot; keep cyclic GC pauses out of
+                # the dispatch timings
+                gc.collect()
+                gc.disable()
+                try:
+                    times[mode] = best_time(lambda: run(ast), repeat)[0]
+                finally:
+                    gc.enable()
+                results[f"visit/{name}/{mode}/{size}"] = {
+                    "nodes": nodes,
+                    "ns_per_node": times[mode] * 1e9 / nodes,
+                }
+            results[f"visit/{name}/{mode}/{size}"]["table_speedup"] = times["name"] / times["table"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Visitor dispatch benchmarks")
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        default=["64K", "1M"],
+        help="Generated source sizes, e.g. 64K 4M (default: 64K 1M)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement, best is kept")
+    parser.add_argument("--save", help="Write results to a JSON file")
+    args = parser.parse_args()
+
+    results = bench_visitors([parse_size(size) for size in args.sizes], args.repeat)
+    print_results(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
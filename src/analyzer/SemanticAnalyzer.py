@@ -1,153 +1,202 @@
+from utils import Visitor
+
+
 class SymbolTable:
-    _scope_counter = 0 
-    
-    def __init__(self, parent=None):
-        self.symbols = {}
-        self.parent = parent
-        self.storage = "global" if parent is None else "local"
-        self.scope_id = SymbolTable._scope_counter
-        SymbolTable._scope_counter += 1
+    # Flat scoped symbol table. Every name maps to the stack of slots of its
+    # visible bindings, innermost last, so a lookup is one dict access however
+    # deep the nesting. Definitions are recorded in an undo log and leaving a
+    # scope pops the ones made since it was entered.
+    #
+    # Each binding gets a dense slot id in definition order; symbols[slot] is
+    # its (type, storage, scope_id). Scope ids count from 0 per table.
+    def __init__(self):
+        self.bindings = {}
+        self.undo_log = []
+        self.scope_marks = []
+        self.scope_ids = []
+        self.scope_count = 0
+        self.symbols = []
+
+    def enter_scope(self):
+        self.scope_marks.append(len(self.undo_log))
+        self.scope_ids.append(self.scope_count)
+        self.scope_count += 1
+
+    def exit_scope(self):
+        mark = self.scope_marks.pop()
+        self.scope_ids.pop()
+        while len(self.undo_log) > mark:
+            name = self.undo_log.pop()
+            slots = self.bindings[name]
+            slots.pop()
+            if not slots:
+                del self.bindings[name]
+
+    @property
+    def storage(self):
+        return "global" if len(self.scope_marks) == 1 else "local"
 
     def define(self, name, type):
-        if name in self.symbols:
+        scope_id = self.scope_ids[-1]
+        slots = self.bindings.setdefault(name, [])
+        if slots and self.symbols[slots[-1]][2] == scope_id:
             raise Exception(f"Semantic Error: Variable '{name}' already defined.")
-        self.symbols[name] = type
+        slot = len(self.symbols)
+        self.symbols.append((type, self.storage, scope_id))
+        slots.append(slot)
+        self.undo_log.append(name)
+        return slot
 
     def lookup(self, name):
-        symbol = self.symbols.get(name)
-        if symbol:
-            return symbol, self.storage, self.scope_id
-        if self.parent:
-            return self.parent.lookup(name)
-        return None, None, None
+        # Slot of the innermost visible binding of name, or None
+        slots = self.bindings.get(name)
+        return slots[-1] if slots else None
 
 
-class SemanticAnalyzer:
+class SemanticAnalyzer(Visitor):
+    # Type rules and their errors are kept in the *_type and check_* methods,
+    # apart from the walk, so SinglePassGenerator raises exactly the same
+    # errors while it emits TAC
     def __init__(self):
-        self.current_scope = None
+        self.symbols = SymbolTable()
 
     def analyze(self, ast):
         self.visit(ast)
 
-    def visit(self, node):
-        method_name = f"visit_{type(node).__name__}"
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
-
-    def generic_visit(self, node):
-        raise Exception(f"No visit_{type(node).__name__} method")
-
     def visit_ProgramNode(self, node):
         self.visit(node.scope)
 
     def visit_ScopeNode(self, node):
-        parent_scope = self.current_scope
-        self.current_scope = SymbolTable(parent=parent_scope)
+        self.symbols.enter_scope()
         for statement in node.statements:
             self.visit(statement)
-        self.current_scope = parent_scope
+        self.symbols.exit_scope()
 
     def visit_DefinerNode(self, node):
-        self.current_scope.define(node.name, node.type)
-        node.storage = self.current_scope.storage
-        node.scope_id = self.current_scope.scope_id
+        node.slot = self.symbols.define(node.name, node.type)
+        _, node.storage, node.scope_id = self.symbols.symbols[node.slot]
         if node.value:
-            value_type = self.visit(node.value)
-            if value_type != node.type:
-                raise Exception(
-                    f"Type Error: Cannot assign value of type '{value_type}' to variable '{node.name}' of type '{node.type}'."
-                )
+            self.check_assignment(node.name, node.type, self.visit(node.value))
 
     def visit_EqualizeNode(self, node):
-        var_type, storage, scope_id = self.current_scope.lookup(node.name)
-        node.storage = storage
-        node.scope_id = scope_id
-        if var_type is None:
-            raise Exception(f"Semantic Error: Variable '{node.name}' not defined.")
-        value_type = self.visit(node.value)
-        if value_type != var_type:
-            raise Exception(
-                f"Type Error: Cannot assign value of type '{value_type}' to variable '{node.name}' of type '{var_type}'."
-            )
+        slot = self.resolve_variable(node.name)
+        var_type, node.storage, node.scope_id = self.symbols.symbols[slot]
+        node.slot = slot
+        self.check_assignment(node.name, var_type, self.visit(node.value))
 
     def visit_ConditionNode(self, node):
         left_type = self.visit(node.left)
         right_type = self.visit(node.right)
+        node.type = self.condition_type(node.operator, left_type, right_type)
+        return node.type
+
+    def visit_ExpressionNode(self, node):
+        left_type = self.visit(node.left)
+        right_type = self.visit(node.right)
+        node.type = self.expression_type(node.operator, left_type, right_type)
+        return node.type
+
+    def visit_TermNode(self, node):
+        left_type = self.visit(node.left)
+        right_type = self.visit(node.right)
+        node.type = self.term_type(node.operator, left_type, right_type)
+        return node.type
+
+    def visit_FactorNode(self, node):
+        if node.is_variable:
+            slot = self.resolve_variable(node.value)
+            var_type, node.storage, node.scope_id = self.symbols.symbols[slot]
+            node.type = var_type
+            node.slot = slot
+            return var_type
+        else:
+            node.type = self.literal_type(node.value)
+            return node.type
+
+    def visit_PrintNode(self, node):
+        expression_type = self.visit(node.expression)
+        node.expression.type = expression_type
+        return expression_type
+
+    def visit_IfNode(self, node):
+        self.check_condition("If", self.visit(node.condition))
+        self.visit(node.scope)
+
+    def visit_WhileNode(self, node):
+        self.check_condition("While", self.visit(node.condition))
+        self.visit(node.scope)
+
+    def resolve_variable(self, name):
+        slot = self.symbols.lookup(name)
+        if slot is None:
+            raise Exception(f"Semantic Error: Variable '{name}' not defined.")
+        return slot
+
+    def check_assignment(self, name, var_type, value_type):
+        if value_type != var_type:
+            raise Exception(
+                f"Type Error: Cannot assign value of type '{value_type}' to variable '{name}' of type '{var_type}'."
+            )
 
-        if node.operator in ("!=", "<", ">", "<=", ">="):
+    def check_condition(self, statement, condition_type):
+        if condition_type != "bool":
+            raise Exception(
+                f"Type Error: {statement} condition must be of type 'bool', got '{condition_type}'."
+            )
+
+    def condition_type(self, operator, left_type, right_type):
+        if operator in ("!=", "<", ">", "<=", ">="):
             if left_type != right_type or "bool" in (left_type, right_type):
                 raise Exception(
                     f"Type Error: Cannot compare values of type '{left_type}' and '{right_type}'."
                 )
-            node.type = "bool"
             return "bool"
-        elif node.operator in ("&", "|"):
+        elif operator in ("&", "|"):
             if left_type != "bool" or right_type != "bool":
                 raise Exception(
                     f"Type Error: Logical operations require boolean operands, got '{left_type}' and '{right_type}'."
                 )
-            node.type = "bool"
             return "bool"
-        elif node.operator in ("=="):
+        elif operator in ("=="):
             if left_type != right_type:
                 raise Exception(
                     f"Type Error: Cannot compare values of type '{left_type}' and '{right_type}'."
                 )
-            node.type = "bool"
             return "bool"
         else:
-            raise Exception(f"Unknown operator '{node.operator}' in condition.")
-
-    def visit_ExpressionNode(self, node):
-        left_type = self.visit(node.left)
-        right_type = self.visit(node.right)
+            raise Exception(f"Unknown operator '{operator}' in condition.")
 
-        if node.operator in ("+", "-"):
+    def expression_type(self, operator, left_type, right_type):
+        if operator in ("+", "-"):
             if left_type == "int" and right_type == "int":
-                node.type = "int"
                 return "int"
             else:
                 raise Exception(
-                    f"Type Error: Cannot perform '{node.operator}' on types '{left_type}' and '{right_type}'."
+                    f"Type Error: Cannot perform '{operator}' on types '{left_type}' and '{right_type}'."
                 )
         else:
-            raise Exception(f"Unknown operator '{node.operator}' in expression.")
-
-    def visit_TermNode(self, node):
-        left_type = self.visit(node.left)
-        right_type = self.visit(node.right)
+            raise Exception(f"Unknown operator '{operator}' in expression.")
 
-        if node.operator in ("*", "/"):
+    def term_type(self, operator, left_type, right_type):
+        if operator in ("*", "/"):
             if left_type == "int" and right_type == "int":
-                node.type = "int"
                 return "int"
             else:
                 raise Exception(
-                    f"Type Error: Cannot perform '{node.operator}' on types '{left_type}' and '{right_type}'."
+                    f"Type Error: Cannot perform '{operator}' on types '{left_type}' and '{right_type}'."
                 )
         else:
-            raise Exception(f"Unknown operator '{node.operator}' in term.")
+            raise Exception(f"Unknown operator '{operator}' in term.")
 
-    def visit_FactorNode(self, node):
-        if node.is_variable:
-            var_type, storage, scope_id = self.current_scope.lookup(node.value)
-            if var_type is None:
-                raise Exception(f"Semantic Error: Variable '{node.value}' not defined.")
-            node.type = var_type
-            node.storage = storage
-            node.scope_id = scope_id
-            return var_type
+    def literal_type(self, value):
+        if self._is_integer_literal(value):
+            return "int"
+        elif self._is_boolean_literal(value):
+            return "bool"
         else:
-            if self._is_integer_literal(node.value):
-                node.type = "int"
-                return "int"
-            elif self._is_boolean_literal(node.value):
-                node.type = "bool"
-                return "bool"
-            else:
-                raise Exception(
-                    f"Type Error: Unknown literal type for value '{node.value}', expected integer or boolean literal."
-                )
+            raise Exception(
+                f"Type Error: Unknown literal type for value '{value}', expected integer or boolean literal."
+            )
 
     def _is_integer_literal(self, value):
         if isinstance(value, str):
@@ -160,24 +209,3 @@ class SemanticAnalyzer:
         if isinstance(value, str):
             return value.lower() in ("true", "false")
         return isinstance(value, bool)
-
-    def visit_PrintNode(self, node):
-        expression_type = self.visit(node.expression)
-        node.expression.type = expression_type
-        return expression_type
-
-    def visit_IfNode(self, node):
-        condition_type = self.visit(node.condition)
-        if condition_type != "bool":
-            raise Exception(
-                f"Type Error: If condition must be of type 'bool', got '{condition_type}'."
-            )
-        self.visit(node.scope)
-
-    def visit_WhileNode(self, node):
-        condition_type = self.visit(node.condition)
-        if condition_type != "bool":
-            raise Exception(
-                f"Type Error: While condition must be of type 'bool', got '{condition_type}'."
-            )
-        self.visit(node.scope)
@@ -0,0 +1,128 @@
+from analyzer import SemanticAnalyzer
+from .TACGenerator import TACGenerator, Var, Const
+
+
+class SinglePassGenerator(TACGenerator, SemanticAnalyzer):
+    # Semantic analysis and TAC generation fused into one walk of the AST.
+    # Every visit method type-checks its node with SemanticAnalyzer's rules
+    # and emits the same TAC as TACGenerator; types are read off the
+    # operands instead of being stored on the nodes.
+    #
+    # The separate passes report any semantic error before any error from
+    # TAC generation, so an out-of-range constant is only raised once the
+    # whole tree has been checked. With release_ast, each statement is
+    # dropped from its scope once its code has been emitted, so the tree is
+    # freed while it is walked.
+    def __init__(self, release_ast=False):
+        TACGenerator.__init__(self)
+        SemanticAnalyzer.__init__(self)
+        self.release_ast = release_ast
+        self.deferred_error = None
+
+    def generate_tac(self, ast):
+        tac = super().generate_tac(ast)
+        if self.deferred_error is not None:
+            raise self.deferred_error
+        return tac
+
+    def visit_ProgramNode(self, node):
+        self.generate(node.scope)
+
+    def visit_ScopeNode(self, node):
+        self.symbols.enter_scope()
+        statements = node.statements
+        for index in range(len(statements)):
+            statement = statements[index]
+            if self.release_ast:
+                statements[index] = None
+            self.generate(statement)
+        self.symbols.exit_scope()
+
+    def visit_DefinerNode(self, node):
+        slot = self.symbols.define(node.name, node.type)
+        _, storage, scope_id = self.symbols.symbols[slot]
+        value = self.generate(node.value) if node.value else None
+        if value is not None:
+            self.check_assignment(node.name, node.type, value.type)
+        result = Var(node.name, type=node.type, storage=storage, scope_id=scope_id)
+        if isinstance(value, Const):
+            self.create_instruction("def", arg1=value, result=result)
+        elif value is not None:
+            self.create_instruction("def", result=result)
+            self.create_instruction(
+                "eq", arg1=value, result=Var(node.name, type=node.type, storage=storage, scope_id=scope_id)
+            )
+        else:
+            self.create_instruction("def", result=result)
+
+    def visit_EqualizeNode(self, node):
+        var_type, storage, scope_id = self.symbols.symbols[self.resolve_variable(node.name)]
+        value = self.generate(node.value)
+        self.check_assignment(node.name, var_type, value.type)
+        self.create_instruction(
+            "eq", arg1=value, result=Var(node.name, type=value.type, storage=storage, scope_id=scope_id)
+        )
+
+    def visit_IfNode(self, node):
+        condition = self.generate(node.condition)
+        self.check_condition("If", condition.type)
+        start_label = self.new_label()
+        self.create_instruction("if", arg1=condition, result=start_label)
+        end_label = self.new_label()
+        self.create_instruction("goto", result=end_label)
+        self.create_instruction("label", result=start_label)
+        self.generate(node.scope)
+        self.create_instruction("label", result=end_label)
+
+    def visit_WhileNode(self, node):
+        start_label = self.new_label()
+        self.create_instruction("label", result=start_label)
+        condition = self.generate(node.condition)
+        self.check_condition("While", condition.type)
+        mid_label = self.new_label()
+        end_label = self.new_label()
+        self.create_instruction("if", arg1=condition, result=mid_label)
+        self.create_instruction("goto", result=end_label)
+        self.create_instruction("label", result=mid_label)
+        self.generate(node.scope)
+        self.create_instruction("goto", result=start_label)
+        self.create_instruction("label", result=end_label)
+
+    def visit_PrintNode(self, node):
+        expression_result = self.generate(node.expression)
+        self.create_instruction("print", arg1=expression_result)
+
+    def visit_ConditionNode(self, node):
+        left = self.generate(node.left)
+        right = self.generate(node.right)
+        type = self.condition_type(node.operator, left.type, right.type)
+        return self.binary(node.operator, left, right, type)
+
+    def visit_ExpressionNode(self, node):
+        left = self.generate(node.left)
+        right = self.generate(node.right)
+        type = self.expression_type(node.operator, left.type, right.type)
+        return self.binary(node.operator, left, right, type)
+
+    def visit_TermNode(self, node):
+        left = self.generate(node.left)
+        right = self.generate(node.right)
+        type = self.term_type(node.operator, left.type, right.type)
+        return self.binary(node.operator, left, right, type)
+
+    def binary(self, operator, left, right, type):
+        temp = self.new_temp(type=type)
+        self.create_instruction(operator, arg1=left, arg2=right, result=temp)
+        return temp
+
+    def visit_FactorNode(self, node):
+        if node.is_variable:
+            var_type, storage, scope_id = self.symbols.symbols[self.resolve_variable(node.value)]
+            return Var(node.value, type=var_type, storage=storage, scope_id=scope_id)
+        type = self.literal_type(node.value)
+        try:
+            return self.constant(node.value, type)
+        except ValueError as error:
+            if self.deferred_error is None:
+                self.deferred_error = error
+            return Const(0, type=type)
@@ -1,3 +1,8 @@
+import json
+import os
+from utils import Visitor
+
+
 class TACInstruction:
     def __init__(self, op, arg1=None, arg2=None, result=None):
         self.op = op
@@ -83,12 +88,74 @@ class Const(Operand):
 
 
 class TAC:
+    # save and load store the instructions as compact JSON, each one as
+    # [op, arg1, arg2, result] with operands encoded by encode_operand. The
+    # file records the key it was saved under and is rejected on a mismatch.
     def __init__(self, instructions):
         self.instructions = instructions
         self.line_count = len(instructions)
 
-
-class TACGenerator:
+    def save(self, path, key):
+        data = {
+            "key": key,
+            "instructions": [
+                [instr.op]
+                + [encode_operand(operand) for operand in (instr.arg1, instr.arg2, instr.result)]
+                for instr in self.instructions
+            ],
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def load(path, key):
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data["key"] != key:
+            raise ValueError(f"TAC cache '{path}' is stale")
+        instructions = []
+        for op, arg1, arg2, result in data["instructions"]:
+            if not isinstance(op, str):
+                raise ValueError(f"TAC cache '{path}' is corrupt")
+            instructions.append(
+                TACInstruction(op, decode_operand(arg1), decode_operand(arg2), decode_operand(result))
+            )
+        return TAC(instructions)
+
+
+def encode_operand(operand):
+    # Labels stay plain strings; operands become [kind, fields...]
+    if operand is None or isinstance(operand, str):
+        return operand
+    if isinstance(operand, TempVar):
+        return ["t", operand.id, operand.type]
+    if isinstance(operand, Var):
+        return ["v", operand.name, operand.type, operand.storage, operand.scope_id]
+    if isinstance(operand, Const):
+        return ["c", operand.value, operand.type]
+    raise TypeError(f"Cannot encode TAC operand {operand!r}")
+
+
+def decode_operand(item):
+    if item is None or isinstance(item, str):
+        return item
+    kind = item[0]
+    if kind == "t":
+        _, id, type = item
+        return TempVar(id, type)
+    if kind == "v":
+        _, name, type, storage, scope_id = item
+        return Var(name, type, storage, scope_id)
+    if kind == "c":
+        _, value, type = item
+        return Const(value, type)
+    raise ValueError(f"Unknown TAC operand kind {kind!r}")
+
+
+class TACGenerator(Visitor):
     def __init__(self):
         self.instructions = []
         self.temp_count = 0
@@ -113,13 +180,7 @@ class TACGenerator:
         self.instructions.append(instruction)
         return instruction
 
-    def generate(self, node):
-        method_name = f"visit_{type(node).__name__}"
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
-
-    def generic_visit(self, node):
-        raise Exception(f"No visit_{type(node).__name__} method")
+    generate = Visitor.visit
 
     def visit_ProgramNode(self, node):
         self.generate(node.scope)
@@ -204,18 +265,21 @@ class TACGenerator:
         if node.is_variable:
             return Var(node.value, type=node.type, storage=node.storage, scope_id=node.scope_id)
         else:
-            # Handle boolean and integer constants properly
-            if node.type == "bool":
-                if node.value.lower() == "true":
-                    value = 1
-                elif node.value.lower() == "false":
-                    value = 0
-                else:
-                    raise ValueError(f"Invalid boolean value: {node.value}")
+            return self.constant(node.value, node.type)
+
+    def constant(self, text, type):
+        # Handle boolean and integer constants properly
+        if type == "bool":
+            if text.lower() == "true":
+                value = 1
+            elif text.lower() == "false":
+                value = 0
             else:
-                value = int(node.value)
-                if value < -2147483648 or value > 2147483647:
-                    raise ValueError(
-                        f"Integer constant out of bounds (32-bit): {value}"
-                    )
-            return Const(value, type=node.type)
+                raise ValueError(f"Invalid boolean value: {text}")
+        else:
+            value = int(text)
+            if value < -2147483648 or value > 2147483647:
+                raise ValueError(
+                    f"Integer constant out of bounds (32-bit): {value}"
+                )
+        return Const(value, type=type)
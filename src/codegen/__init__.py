@@ -3,8 +3,10 @@ Code Generation Module
 
 This module contains intermediate code generation components:
 - TACGenerator: Three Address Code generator
+- SinglePassGenerator: Type-checks the AST and generates TAC in one walk
 """
 
 from .TACGenerator import TACGenerator, TAC, TACInstruction, Var, Const, TempVar
+from .SinglePassGenerator import SinglePassGenerator
 
-__all__ = ['TACGenerator', 'TAC', 'TACInstruction', 'Var', 'Const', 'TempVar']
\ No newline at end of file
+__all__ = ['TACGenerator', 'SinglePassGenerator', 'TAC', 'TACInstruction', 'Var', 'Const', 'TempVar']
\ No newline at end of file
@@ -3,22 +3,38 @@ import argparse
 import sys
 import platform
 import os
+import mmap
+import hashlib
 from lexer import Tokenizer
-from parser import Parser
-from codegen import TAC, TACGenerator
+from parser import Parser, IterativeParser
+from codegen import TAC, TACGenerator, SinglePassGenerator
 from optimization import Optimizer
 from backend import X86Backend
 from analyzer import SemanticAnalyzer
 
+BUILD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "build")
+CACHE_DIR = os.path.join(BUILD_DIR, "cache")
 
-def create_tokenizer():
-    tokenizer = Tokenizer()
+# Part of the front-end cache key; bump when lexing, parsing, semantic
+# analysis or TAC generation change the TAC they produce
+FRONTEND_VERSION = 1
+
+PARSERS = {
+    "recursive": Parser,
+    "iterative": IterativeParser,
+}
+
+
+def create_tokenizer(cache_dir=None):
+    tokenizer = Tokenizer(cache_dir)
 
     tokenizer.add_skip_pattern("( |\t|\n)+")
 
-    tokenizer.add_pattern("KEYWORD", "(while|print|var|if|do)", priority=5)
-    tokenizer.add_pattern("TYPE", "(int|bool)", priority=5)
-    tokenizer.add_pattern("BOOLEAN", "(true|false)", priority=6)  # Add boolean literals
+    tokenizer.add_reserved_words(
+        "KEYWORD", ("while", "print", "var", "if", "do"), priority=5
+    )
+    tokenizer.add_reserved_words("TYPE", ("int", "bool"), priority=5)
+    tokenizer.add_reserved_words("BOOLEAN", ("true", "false"), priority=6)  # Add boolean literals
     tokenizer.add_pattern(
         "IDENTIFIER", "([a-z]|[A-Z])([a-z]|[A-Z]|[0-9]|_)*", priority=4
     )
@@ -32,12 +48,73 @@ def create_tokenizer():
     return tokenizer
 
 
-def tokenize(input_str):
-    tokenizer = create_tokenizer()
-    tokens = tokenizer.tokenize(input_str)
+def tokenize(input_str, cache_dir=None, jobs=1):
+    tokenizer = create_tokenizer(cache_dir)
+    if jobs > 1:
+        return tokenizer.tokenize_parallel(input_str, workers=jobs)
+    tokens = tokenizer.tokenize_buffer(input_str)
     return tokens
 
 
+def echo_tokens(tokens):
+    for token in tokens:
+        print(token)
+        yield token
+
+
+def parse_stream(input_file, print_tokens=False, cache_dir=None, parser_mode="recursive"):
+    # Lexes and parses input_file incrementally, so the whole source and
+    # token list are never held in memory at once.
+    try:
+        raw_code = open(input_file, "r")
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.")
+        sys.exit(1)
+    except PermissionError:
+        print(f"Error: Permission denied when reading '{input_file}'.")
+        sys.exit(1)
+    with raw_code:
+        tokens = create_tokenizer(cache_dir).tokenize_stream(raw_code)
+        if print_tokens:
+            tokens = echo_tokens(tokens)
+        parser = PARSERS[parser_mode](tokens)
+        if parser.tokens.peek() is None:
+            print("Error: Input file is empty.")
+            sys.exit(1)
+        return parser, parser.parse_program()
+
+
+def parse_mmap(input_file, print_tokens=False, cache_dir=None, parser_mode="recursive"):
+    # Lexes input_file straight from a read-only memory map; the source is
+    # never read into a str. Returns None for files with "\r" line endings,
+    # which only the text path translates.
+    try:
+        raw_code = open(input_file, "rb")
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.")
+        sys.exit(1)
+    except PermissionError:
+        print(f"Error: Permission denied when reading '{input_file}'.")
+        sys.exit(1)
+    with raw_code:
+        if os.fstat(raw_code.fileno()).st_size == 0:
+            print("Error: Input file is empty.")
+            sys.exit(1)
+        with mmap.mmap(raw_code.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            if source.find(b"\r") >= 0:
+                return None
+            tokens = create_tokenizer(cache_dir).tokenize_buffer(source)
+            if not len(tokens):
+                print("Error: Input file is empty.")
+                sys.exit(1)
+            if print_tokens:
+                for token in tokens:
+                    print(token)
+            parser = PARSERS[parser_mode](tokens)
+            ast = parser.parse_program()
+    return parser, ast
+
+
 def get_os_commands():
     """Detect operating system and return appropriate commands"""
     system = platform.system().lower()
@@ -60,6 +137,94 @@ def get_os_commands():
         }
 
 
+def frontend_cache_key(input_file):
+    # Hash of the file contents, the lexer's patterns and reserved words and
+    # FRONTEND_VERSION. None if the file is unreadable.
+    digest = hashlib.sha256(
+        f"{FRONTEND_VERSION}:{create_tokenizer().matcher.spec_key()}:".encode()
+    )
+    try:
+        with open(input_file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()[:32]
+
+
+def frontend_cache_path(cache_dir, key):
+    return os.path.join(cache_dir, f"frontend-{key}.json")
+
+
+def load_frontend_cache(path, key):
+    try:
+        return TAC.load(path, key)
+    except (OSError, ValueError, KeyError, TypeError, IndexError):
+        return None
+
+
+def save_frontend_cache(path, key, tac):
+    # Written before optimization, which rewrites the instructions in place
+    try:
+        tac.save(path, key)
+    except OSError:
+        pass
+
+
+def run_frontend(
+    input_file,
+    print_tokens=False,
+    print_ast=False,
+    stream=False,
+    cache_dir=None,
+    jobs=1,
+    use_mmap=False,
+    parser_mode="recursive",
+    single_pass=False,
+):
+    # Lexing, parsing, semantic analysis and TAC generation
+    parsed = None
+    if stream:
+        parsed = parse_stream(input_file, print_tokens, cache_dir, parser_mode)
+    elif use_mmap:
+        parsed = parse_mmap(input_file, print_tokens, cache_dir, parser_mode)
+    if parsed is not None:
+        parser, ast = parsed
+    else:
+        input_str = ""
+        try:
+            with open(input_file, "r") as raw_code:
+                input_str = raw_code.read()
+        except FileNotFoundError:
+            print(f"Error: Input file '{input_file}' not found.")
+            sys.exit(1)
+        except PermissionError:
+            print(f"Error: Permission denied when reading '{input_file}'.")
+            sys.exit(1)
+        if not input_str.strip():
+            print("Error: Input file is empty.")
+            sys.exit(1)
+
+        tokens = tokenize(input_str, cache_dir, jobs)
+        parser = PARSERS[parser_mode](tokens)
+        if print_tokens:
+            for token in tokens:
+                print(token)
+        ast = parser.parse_program()
+    if single_pass:
+        # Statements are released as they are compiled unless the AST is
+        # still to be printed
+        tac = SinglePassGenerator(release_ast=not print_ast).generate_tac(ast)
+    else:
+        sa = SemanticAnalyzer()
+        sa.analyze(ast)
+        tacg = TACGenerator()
+        tac = tacg.generate_tac(ast)
+    if print_ast:
+        parser.print_ast(ast)
+    return tac
+
+
 def compile_program(
     input_file,
     optimize=True,
@@ -69,33 +234,43 @@ def compile_program(
     print_tac=False,
     print_optimized_tac=False,
     save_asm=None,
+    stream=False,
+    cache=True,
+    jobs=1,
+    use_mmap=False,
+    parser_mode="recursive",
+    single_pass=False,
 ):
-    input_str = ""
-    try:
-        with open(input_file, "r") as raw_code:
-            input_str = raw_code.read()
-    except FileNotFoundError:
-        print(f"Error: Input file '{input_file}' not found.")
-        sys.exit(1)
-    except PermissionError:
-        print(f"Error: Permission denied when reading '{input_file}'.")
-        sys.exit(1)
-    if not input_str.strip():
-        print("Error: Input file is empty.")
-        sys.exit(1)
-
-    tokens = tokenize(input_str)
-    parser = Parser(tokens)
-    if print_tokens:
-        for token in tokens:
-            print(token)
-    ast = parser.parse_program()
-    sa = SemanticAnalyzer()
-    sa.analyze(ast)
-    tacg = TACGenerator()
-    tac = tacg.generate_tac(ast)
-    if print_ast:
-        parser.print_ast(ast)
+    cache_dir = CACHE_DIR if cache else None
+    # The front-end cache holds TAC only, so it is bypassed when the tokens
+    # or the AST are to be printed
+    tac_key = None
+    tac = None
+    if cache_dir and not (print_tokens or print_ast):
+        tac_key = frontend_cache_key(input_file)
+        if tac_key:
+            tac_path = frontend_cache_path(cache_dir, tac_key)
+            tac = load_frontend_cache(tac_path, tac_key)
+    if tac is None:
+        # Only the iterative parser and the AST printer are free of recursion;
+        # semantic analysis and TAC generation recurse once per nesting level
+        try:
+            tac = run_frontend(
+                input_file,
+                print_tokens,
+                print_ast,
+                stream,
+                cache_dir,
+                jobs,
+                use_mmap,
+                parser_mode,
+                single_pass,
+            )
+        except RecursionError:
+            print("Error: Program is nested too deeply to compile.")
+            sys.exit(1)
+        if tac_key:
+            save_frontend_cache(tac_path, tac_key, tac)
     if print_tac:
         for instr in tac.instructions:
             print(instr)
@@ -114,7 +289,7 @@ def compile_program(
     os_commands = get_os_commands()
 
     # Determine file paths
-    build_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "build")
+    build_dir = BUILD_DIR
     objects_dir = os.path.join(build_dir, "objects")
     executables_dir = os.path.join(build_dir, "executables")
 
@@ -214,6 +389,39 @@ def main():
         "--save-asm",
         help="Save assembly file with specified name (default: don't save)",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Lex and parse the input file incrementally instead of reading it whole",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=sorted(PARSERS),
+        default="recursive",
+        help="Parser implementation; 'iterative' parses without a nesting depth limit (default: recursive)",
+    )
+    parser.add_argument(
+        "--single-pass",
+        action="store_true",
+        help="Type-check and generate TAC in one walk of the AST instead of two",
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="Lex the input file from a memory map instead of reading it into a string",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to lex large inputs (default: 1)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write cached compiler data in build/cache",
+    )
 
     args = parser.parse_args()
 
@@ -226,6 +434,12 @@ def main():
         print_tac=args.print_tac,
         print_optimized_tac=args.print_optimized_tac,
         save_asm=args.save_asm,
+        stream=args.stream,
+        cache=not args.no_cache,
+        jobs=args.jobs,
+        use_mmap=args.mmap,
+        parser_mode=args.parser,
+        single_pass=args.single_pass,
     )
 
 
@@ -0,0 +1,108 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; Tokenizer falls back to plain scans
+    np = None
+
+
+class CharClassifier:
+    # Vectorized pre-pass over a whole source buffer. Every character is
+    # mapped to its DFA character class in one NumPy lookup, and the runs of
+    # skip characters are found with array ops, so the tokenizer only has to
+    # run the DFA from token starts.
+    #
+    # This is only valid when the skip patterns match every single character
+    # of some set W and nothing but strings over W (e.g. "( |\t|\n)+"). The
+    # scan from a W character is then always a skip that stays inside the
+    # current run of W characters, so the run as a whole is skipped text and
+    # the tokenizer can jump over it. skip_classes is the set of class ids
+    # making up W, or None when the lexer's DFA does not have that shape.
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.dfa = matcher.compile() if matcher.dfa is None else matcher.dfa
+        self.skip_classes = self.find_skip_classes()
+        self.classmap = None
+        self.skip_table = None
+        if np is not None and self.skip_classes is not None:
+            dtype = np.uint8 if self.dfa.class_count <= 256 else np.int32
+            self.classmap = np.array(self.dfa.classmap.tolist() or [0], dtype=dtype)
+            self.skip_table = np.zeros(self.dfa.class_count, dtype=bool)
+            self.skip_table[sorted(self.skip_classes)] = True
+
+    @staticmethod
+    def available():
+        return np is not None
+
+    @property
+    def usable(self):
+        return self.skip_table is not None
+
+    def find_skip_classes(self):
+        dfa = self.dfa
+        width = dfa.class_count
+        table = dfa.table
+        skip_tag_count = self.matcher.skip_tag_count
+
+        def is_skip(state):
+            tag = dfa.accepting[state]
+            return tag is not None and tag < skip_tag_count
+
+        def reachable(states, classes):
+            seen = set(states)
+            stack = list(seen)
+            while stack:
+                state = stack.pop()
+                for class_id in classes:
+                    next_state = table[state * width + class_id]
+                    if next_state >= 0 and next_state not in seen:
+                        seen.add(next_state)
+                        stack.append(next_state)
+            return seen
+
+        skip_classes = set()
+        for class_id in range(1, width):
+            state = table[dfa.start * width + class_id]
+            if state >= 0 and is_skip(state):
+                skip_classes.add(class_id)
+        if not skip_classes:
+            return None
+
+        # No string containing a character outside W may reach a skip state
+        run_states = reachable([dfa.start], skip_classes)
+        other_classes = [c for c in range(1, width) if c not in skip_classes]
+        other_starts = set()
+        for state in run_states:
+            for class_id in other_classes:
+                next_state = table[state * width + class_id]
+                if next_state >= 0:
+                    other_starts.add(next_state)
+        if any(is_skip(state) for state in reachable(other_starts, range(1, width))):
+            return None
+        return frozenset(skip_classes)
+
+    def codes(self, source):
+        # Character codes of source as a NumPy array. Byte strings (including
+        # mmap objects) are wrapped without copying.
+        if not isinstance(source, str):
+            return np.frombuffer(source, dtype=np.uint8)
+        if source.isascii():
+            return np.frombuffer(source.encode("ascii"), dtype=np.uint8)
+        return np.frombuffer(source.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+
+    def classify(self, source):
+        # DFA class id of every character; characters beyond the class map
+        # fall in the dead class 0
+        codes = self.codes(source)
+        size = len(self.classmap)
+        if len(codes) and codes.max() >= size:
+            class_ids = self.classmap[np.minimum(codes, size - 1)]
+            class_ids[codes >= size] = 0
+            return class_ids
+        return self.classmap[codes]
+
+    def skip_runs(self, source):
+        # (starts, ends) of the maximal runs of skip characters in source
+        skip = self.skip_table[self.classify(source)]
+        edges = np.diff(skip.view(np.int8), prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        return starts.tolist(), ends.tolist()
@@ -4,29 +4,65 @@
 # <factor>  ::= <base> ("*" | "+" | "?")*
 # <base>    ::= <char> | "[" <char> "-" <char> "]" | "(" <regex> ")"
 
+from array import array
+from utils import Visitor
+
+
+# The engines also match over byte strings (bytes, bytearray, memoryview,
+# mmap). A byte is treated as the character with the same code, so byte
+# input behaves like its latin-1 decoding without being decoded.
+
+
+def code_reader(string):
+    # Function from an item of string to its character code. Items of byte
+    # strings are already integers.
+    return ord if isinstance(string, str) else int
+
+
+def char_reader(string):
+    # Function from an item of string to a one-character str
+    return str if isinstance(string, str) else chr
+
+
+def text_slice(string, start, end):
+    # string[start:end] as a str
+    if isinstance(string, str):
+        return string[start:end]
+    return str(string[start:end], "latin-1")
+
 
 class CharNode:
+    __slots__ = ("char",)
+
     def __init__(self, char):
         self.char = char
 
 
 class CharSetNode:
+    __slots__ = ("charset",)
+
     def __init__(self, charset):
-        self.charset = set(charset)
+        self.charset = frozenset(charset)
 
 
 class ConcatNode:
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
 
 
 class StarNode:
+    __slots__ = ("left",)
+
     def __init__(self, left):
         self.left = left
 
 
 class UnionNode:
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
@@ -144,196 +180,614 @@ class RegexParser:
         self.pos += 1
         return ch
 
-    def printAST(self, indent=0):
+    def printAST(self, ast, indent=0):
         # use for only debug purposes
-        ast = self.ast
-        prefix = " " * indent
-        if isinstance(ast, CharNode):
-            print(f"{prefix}CharNode({ast.char})")
-        elif isinstance(ast, CharSetNode):
-            print(f"{prefix}CharSetNode({''.join(sorted(ast.charset))})")
-        elif isinstance(ast, ConcatNode):
-            print(f"{prefix}ConcatNode(")
-            self.printAST(None, ast.left, indent + 2)
-            self.printAST(None, ast.right, indent + 2)
-            print(f"{prefix})")
-        elif isinstance(ast, StarNode):
-            print(f"{prefix}StarNode(")
-            self.printAST(None, ast.left, indent + 2)
-            print(f"{prefix})")
-        elif isinstance(ast, UnionNode):
-            print(f"{prefix}UnionNode(")
-            self.printAST(None, ast.left, indent + 2)
-            self.printAST(None, ast.right, indent + 2)
-            print(f"{prefix})")
-        else:
-            raise ValueError("Unknown AST node type")
+        RegexASTPrinter(indent).visit(ast)
 
 
-class State:
-    def __init__(self):
-        self.transitions = {}  # char -> set of states
-        self.is_final = False
+class RegexASTPrinter(Visitor):
+    # Prints a regex AST one node per line, indented by depth
+    def __init__(self, indent=0):
+        self.indent = indent
 
+    def line(self, text):
+        print(f"{' ' * self.indent}{text}")
 
-class NFA:
-    def __init__(self, start, end):
-        self.start = start
-        self.end = end
+    def children(self, name, *nodes):
+        self.line(f"{name}(")
+        self.indent += 2
+        for node in nodes:
+            self.visit(node)
+        self.indent -= 2
+        self.line(")")
+
+    def generic_visit(self, node):
+        raise ValueError("Unknown AST node type")
 
+    def visit_CharNode(self, node):
+        self.line(f"CharNode({node.char})")
 
-class ThompsonConstruction:
-    def __init__(self, ast):
+    def visit_CharSetNode(self, node):
+        self.line(f"CharSetNode({''.join(sorted(node.charset))})")
+
+    def visit_ConcatNode(self, node):
+        self.children("ConcatNode", node.left, node.right)
+
+    def visit_StarNode(self, node):
+        self.children("StarNode", node.left)
+
+    def visit_UnionNode(self, node):
+        self.children("UnionNode", node.left, node.right)
+
+
+class NFA:
+    # States are integer ids into parallel arrays. A Thompson state has at
+    # most one character edge (labels[state] is the frozenset of characters
+    # on it, targets[state] its target) plus any number of epsilon edges.
+    __slots__ = ("labels", "targets", "epsilons", "start", "end")
+
+    def __init__(self):
+        self.labels = []  # state -> frozenset of chars, None if no char edge
+        self.targets = array("i")  # state -> char edge target, -1 if none
+        self.epsilons = []  # state -> list of epsilon targets
+        self.start = -1
+        self.end = -1
+
+    def add_state(self):
+        self.labels.append(None)
+        self.targets.append(-1)
+        self.epsilons.append([])
+        return len(self.labels) - 1
+
+    def add_edge(self, source, chars, target):
+        self.labels[source] = frozenset(chars)
+        self.targets[source] = target
+
+    def add_epsilon(self, source, target):
+        self.epsilons[source].append(target)
+
+    @property
+    def state_count(self):
+        return len(self.labels)
+
+
+class ThompsonConstruction(Visitor):
+    # Fragments are (start, end) state id pairs inside one NFA. Pass an
+    # existing nfa to build several regexes into the same state arrays.
+    # Each visit method builds the fragment of one regex AST node.
+    def __init__(self, ast, nfa=None):
         self.ast = ast
+        self.nfa = nfa if nfa is not None else NFA()
 
-    def createCharNFA(self, charnode):
-        start = State()
-        end = State()
-        start.transitions.setdefault("".join(charnode.char), set()).add(end)
-        return NFA(start, end)
-
-    def createCharSetNFA(self, charsetnode):
-        start = State()
-        end = State()
-        for char in charsetnode.charset:
-            start.transitions.setdefault(char, set()).add(end)
-        return NFA(start, end)
-
-    def createConcatNFA(self, concatnode):
-        left_nfa = self.build(concatnode.left)
-        right_nfa = self.build(concatnode.right)
-        left_nfa.end.transitions.setdefault("", set()).add(right_nfa.start)
-        return NFA(left_nfa.start, right_nfa.end)
-
-    def createUnionNFA(self, unionnode):
-        start = State()
-        end = State()
-        left_nfa = self.build(unionnode.left)
-        right_nfa = self.build(unionnode.right)
-        start.transitions.setdefault("", set()).add(left_nfa.start)
-        start.transitions.setdefault("", set()).add(right_nfa.start)
-        left_nfa.end.transitions.setdefault("", set()).add(end)
-        right_nfa.end.transitions.setdefault("", set()).add(end)
-        return NFA(start, end)
-
-    def createStarNFA(self, starnode):
-        start = State()
-        end = State()
-        mid = self.build(starnode.left)
-        start.transitions.setdefault("", set()).add(end)
-        start.transitions.setdefault("", set()).add(mid.start)
-        mid.end.transitions.setdefault("", set()).add(end)
-        mid.end.transitions.setdefault("", set()).add(mid.start)
-        return NFA(start, end)
-
-    def build(self, ast=None):
+    def visit_CharNode(self, charnode):
+        start = self.nfa.add_state()
+        end = self.nfa.add_state()
+        if charnode.char == "":
+            self.nfa.add_epsilon(start, end)
+        else:
+            self.nfa.add_edge(start, charnode.char, end)
+        return start, end
+
+    def visit_CharSetNode(self, charsetnode):
+        start = self.nfa.add_state()
+        end = self.nfa.add_state()
+        self.nfa.add_edge(start, charsetnode.charset, end)
+        return start, end
+
+    def visit_ConcatNode(self, concatnode):
+        left_start, left_end = self.build_fragment(concatnode.left)
+        right_start, right_end = self.build_fragment(concatnode.right)
+        self.nfa.add_epsilon(left_end, right_start)
+        return left_start, right_end
+
+    def visit_UnionNode(self, unionnode):
+        start = self.nfa.add_state()
+        end = self.nfa.add_state()
+        left_start, left_end = self.build_fragment(unionnode.left)
+        right_start, right_end = self.build_fragment(unionnode.right)
+        self.nfa.add_epsilon(start, left_start)
+        self.nfa.add_epsilon(start, right_start)
+        self.nfa.add_epsilon(left_end, end)
+        self.nfa.add_epsilon(right_end, end)
+        return start, end
+
+    def visit_StarNode(self, starnode):
+        start = self.nfa.add_state()
+        end = self.nfa.add_state()
+        mid_start, mid_end = self.build_fragment(starnode.left)
+        self.nfa.add_epsilon(start, end)
+        self.nfa.add_epsilon(start, mid_start)
+        self.nfa.add_epsilon(mid_end, end)
+        self.nfa.add_epsilon(mid_end, mid_start)
+        return start, end
+
+    def build_fragment(self, ast=None):
         if ast is None:
             ast = self.ast
-        if isinstance(ast, CharNode):
-            return self.createCharNFA(ast)
-        elif isinstance(ast, CharSetNode):
-            return self.createCharSetNFA(ast)
-        elif isinstance(ast, ConcatNode):
-            return self.createConcatNFA(ast)
-        elif isinstance(ast, UnionNode):
-            return self.createUnionNFA(ast)
-        elif isinstance(ast, StarNode):
-            return self.createStarNFA(ast)
+        return self.visit(ast)
+
+    def build(self):
+        self.nfa.start, self.nfa.end = self.build_fragment()
+        return self.nfa
 
     def print_nfa(self, nfa):
-        # Assign unique IDs to states for printing
-        state_ids = {}
-
-        def assign_ids(state, next_id=[0]):
-            if state not in state_ids:
-                state_ids[state] = next_id[0]
-                next_id[0] += 1
-                for chars, states in state.transitions.items():
-                    for s in states:
-                        assign_ids(s, next_id)
-
-        assign_ids(nfa.start)
-
-        # Print states and transitions
-        printed = set()
-
-        def print_state(state):
-            if state in printed:
-                return
-            printed.add(state)
-            sid = state_ids[state]
-            final = " (final)" if state.is_final or state is nfa.end else ""
-            print(f"State {sid}{final}:")
-            for chars, states in state.transitions.items():
-                for s in states:
-                    target_id = state_ids[s]
-                    label = chars if chars != "" else "ε"
-                    print(f"  --{label}--> State {target_id}")
-            for states in state.transitions.values():
-                for s in states:
-                    print_state(s)
-
-        print_state(nfa.start)
+        for state in range(nfa.state_count):
+            final = " (final)" if state == nfa.end else ""
+            print(f"State {state}{final}:")
+            if nfa.labels[state] is not None:
+                label = "".join(sorted(nfa.labels[state]))
+                print(f"  --{label}--> State {nfa.targets[state]}")
+            for target in nfa.epsilons[state]:
+                print(f"  --ε--> State {target}")
 
 
 class NFAExecutor:
-    def __init__(self, nfa):
+    # The epsilon closure of each single state is computed once (the first
+    # time it is needed) and the closure of a state set is memoized by the
+    # set, so simulation never walks epsilon edges in the matching loop.
+    def __init__(self, nfa, closure_cache_size=4096):
         self.nfa = nfa
+        self.closures = [None] * nfa.state_count
+        self.closure_cache = {}
+        self.closure_cache_size = closure_cache_size
+
+    def state_closure(self, start):
+        closure = self.closures[start]
+        if closure is None:
+            epsilons = self.nfa.epsilons
+            stack = [start]
+            closure = {start}
+            while stack:
+                state = stack.pop()
+                for next_state in epsilons[state]:
+                    if next_state not in closure:
+                        closure.add(next_state)
+                        stack.append(next_state)
+            closure = frozenset(closure)
+            self.closures[start] = closure
+        return closure
 
     def epsilon_closure(self, states):
-        stack = list(states)
-        closure = set(states)
-        while stack:
-            state = stack.pop()
-            for next_state in state.transitions.get("", []):
-                if next_state not in closure:
-                    closure.add(next_state)
-                    stack.append(next_state)
+        key = frozenset(states)
+        closure = self.closure_cache.get(key)
+        if closure is None:
+            closure = frozenset().union(*[self.state_closure(state) for state in key])
+            if len(self.closure_cache) >= self.closure_cache_size:
+                self.closure_cache.clear()
+            self.closure_cache[key] = closure
         return closure
 
     def move(self, states, char):
+        labels = self.nfa.labels
+        targets = self.nfa.targets
         next_states = set()
         for state in states:
-            for next_state in state.transitions.get(char, []):
-                next_states.add(next_state)
+            label = labels[state]
+            if label is not None and char in label:
+                next_states.add(targets[state])
         return next_states
 
     def accepts(self, string):
+        char_of = char_reader(string)
         current_states = self.epsilon_closure({self.nfa.start})
-        for char in string:
-            current_states = self.epsilon_closure(self.move(current_states, char))
-        if any(state.is_final or state is self.nfa.end for state in current_states):
+        for i in range(len(string)):
+            current_states = self.epsilon_closure(self.move(current_states, char_of(string[i])))
+        if self.nfa.end in current_states:
             return string
         return None
 
-    def find_longest_match(self, string):
+    def find_longest_match(self, string, start=0):
+        char_of = char_reader(string)
         current_states = self.epsilon_closure({self.nfa.start})
         last_match_pos = -1
 
-        for i, char in enumerate(string):
-            current_states = self.epsilon_closure(self.move(current_states, char))
+        for i in range(start, len(string)):
+            current_states = self.epsilon_closure(self.move(current_states, char_of(string[i])))
             if not current_states:
                 break
-            if any(state.is_final or state is self.nfa.end for state in current_states):
+            if self.nfa.end in current_states:
+                last_match_pos = i
+
+        if last_match_pos >= 0:
+            return string[start : last_match_pos + 1], last_match_pos + 1 - start
+        return None, 0
+
+
+class DFA:
+    # Transitions live in one flat array indexed by
+    # state * class_count + class id, where class ids come from an
+    # AlphabetPartition. Class 0 collects every character no pattern uses,
+    # so its column is always dead (-1).
+    def __init__(self, classmap, class_count):
+        self.classmap = classmap  # ord(char) -> class id
+        self.class_count = class_count
+        self.table = array("i")
+        self.accepting = []  # state id -> accepting tag, None if not accepting
+        self.start = 0
+
+    def add_state(self, accepting=None):
+        self.table.extend(array("i", [-1]) * self.class_count)
+        self.accepting.append(accepting)
+        return len(self.accepting) - 1
+
+    @property
+    def state_count(self):
+        return len(self.accepting)
+
+
+class AlphabetPartition:
+    # Splits the characters used by an NFA into equivalence classes: two
+    # characters share a class when every NFA state moves on them to the
+    # same targets, so the DFA only needs one column per class.
+    def __init__(self, nfa):
+        self.nfa = nfa
+
+    def build(self):
+        signatures = {}
+        for state, label in enumerate(self.nfa.labels):
+            if label is not None:
+                for char in label:
+                    signatures.setdefault(char, set()).add(state)
+
+        classes = {}
+        for char in sorted(signatures):
+            classes.setdefault(frozenset(signatures[char]), []).append(char)
+        classes = list(classes.values())
+
+        size = max((ord(char) for char in signatures), default=-1) + 1
+        classmap = array("i", [0]) * size
+        for class_id, chars in enumerate(classes, start=1):
+            for char in chars:
+                classmap[ord(char)] = class_id
+        # Class 0 (unused characters) has no representative
+        representatives = [None] + [chars[0] for chars in classes]
+        return classmap, representatives
+
+
+class SubsetConstruction:
+    # Regex -> NFA (Thompson) -> DFA, every DFA state is the epsilon closure
+    # of a set of NFA states. tags maps final NFA states to integer tags; a
+    # DFA state accepts with the lowest tag among the NFA states it contains.
+    def __init__(self, nfa, tags=None):
+        self.nfa = nfa
+        self.executor = NFAExecutor(nfa)
+        self.tags = tags if tags is not None else {nfa.end: 0}
+
+    def accepting_tag(self, states):
+        tags = [self.tags[state] for state in states if state in self.tags]
+        return min(tags) if tags else None
+
+    def build(self):
+        classmap, representatives = AlphabetPartition(self.nfa).build()
+        dfa = DFA(classmap, len(representatives))
+        width = dfa.class_count
+        start = frozenset(self.executor.epsilon_closure({self.nfa.start}))
+        state_ids = {start: dfa.add_state(self.accepting_tag(start))}
+        worklist = [start]
+        while worklist:
+            current = worklist.pop()
+            base = state_ids[current] * width
+            for class_id in range(1, width):
+                target = self.executor.move(current, representatives[class_id])
+                if not target:
+                    continue
+                target = frozenset(self.executor.epsilon_closure(target))
+                target_id = state_ids.get(target)
+                if target_id is None:
+                    target_id = dfa.add_state(self.accepting_tag(target))
+                    state_ids[target] = target_id
+                    worklist.append(target)
+                dfa.table[base + class_id] = target_id
+        return dfa
+
+
+class DFAMinimizer:
+    # Hopcroft's partition refinement. Missing transitions go to an implicit
+    # dead state, which is dropped again (with everything equivalent to it)
+    # when the minimized DFA is rebuilt.
+    def __init__(self, dfa):
+        self.dfa = dfa
+
+    def minimize(self):
+        dfa = self.dfa
+        dead = dfa.state_count
+        width = dfa.class_count
+        table = dfa.table
+        # Class 0 always leads to the dead state and never splits a block
+        alphabet = range(1, width)
+
+        inverse = {class_id: {} for class_id in alphabet}
+        for source in range(dead + 1):
+            for class_id in alphabet:
+                target = table[source * width + class_id] if source < dead else -1
+                if target < 0:
+                    target = dead
+                inverse[class_id].setdefault(target, []).append(source)
+
+        groups = {}
+        for state in range(dead + 1):
+            label = dfa.accepting[state] if state < dead else None
+            groups.setdefault(label, set()).add(state)
+        partition = list(groups.values())
+        block_of = {}
+        for index, block in enumerate(partition):
+            for state in block:
+                block_of[state] = index
+
+        worklist = set(range(len(partition)))
+        while worklist:
+            splitter = partition[worklist.pop()]
+            for class_id in alphabet:
+                predecessors = set()
+                for state in splitter:
+                    predecessors.update(inverse[class_id].get(state, ()))
+                touched = {}
+                for state in predecessors:
+                    touched.setdefault(block_of[state], set()).add(state)
+                for index, inside in touched.items():
+                    block = partition[index]
+                    if len(inside) == len(block):
+                        continue
+                    outside = block - inside
+                    partition[index] = inside
+                    partition.append(outside)
+                    new_index = len(partition) - 1
+                    for state in outside:
+                        block_of[state] = new_index
+                    if index in worklist or len(outside) <= len(inside):
+                        worklist.add(new_index)
+                    else:
+                        worklist.add(index)
+
+        return self.rebuild(partition, block_of, dead)
+
+    def rebuild(self, partition, block_of, dead):
+        dfa = self.dfa
+        width = dfa.class_count
+        minimized = DFA(dfa.classmap, width)
+        dead_block = block_of[dead]
+        new_ids = {}
+        order = [block_of[dfa.start]]
+        new_ids[order[0]] = minimized.add_state(dfa.accepting[dfa.start])
+        for block_index in order:
+            representative = next(iter(partition[block_index]))
+            base = new_ids[block_index] * width
+            for class_id in range(1, width):
+                target = dfa.table[representative * width + class_id]
+                if target < 0 or block_of[target] == dead_block:
+                    continue
+                target_block = block_of[target]
+                if target_block not in new_ids:
+                    new_ids[target_block] = minimized.add_state(dfa.accepting[target])
+                    order.append(target_block)
+                minimized.table[base + class_id] = new_ids[target_block]
+        return minimized
+
+
+class DFAExecutor:
+    def __init__(self, dfa):
+        self.dfa = dfa
+        # The DFA keeps its tables in compact arrays; the scan loops index
+        # plain list copies, which CPython reads faster than array items.
+        self.table = dfa.table.tolist()
+        self.classmap = dfa.classmap.tolist()
+
+    def accepts(self, string):
+        table = self.table
+        classmap = self.classmap
+        width = self.dfa.class_count
+        state = self.dfa.start
+        code_of = code_reader(string)
+        for i in range(len(string)):
+            try:
+                state = table[state * width + classmap[code_of(string[i])]]
+            except IndexError:
+                return None
+            if state < 0:
+                return None
+        if self.dfa.accepting[state] is not None:
+            return string
+        return None
+
+    def find_longest_match(self, string, start=0):
+        table = self.table
+        classmap = self.classmap
+        width = self.dfa.class_count
+        accepting = self.dfa.accepting
+        state = self.dfa.start
+        code_of = code_reader(string)
+        last_match_pos = -1
+
+        for i in range(start, len(string)):
+            try:
+                state = table[state * width + classmap[code_of(string[i])]]
+            except IndexError:
+                break
+            if state < 0:
+                break
+            if accepting[state] is not None:
+                last_match_pos = i
+
+        if last_match_pos >= 0:
+            return string[start : last_match_pos + 1], last_match_pos + 1 - start
+        return None, 0
+
+
+class LazyDFAState:
+    __slots__ = ("states", "accepting", "transitions")
+
+    def __init__(self, states, accepting):
+        self.states = states  # frozenset of NFA states
+        self.accepting = accepting
+        self.transitions = {}  # char -> LazyDFAState, None for the dead state
+
+
+class LazyDFAExecutor:
+    # Builds DFA states from NFA state sets only when a scan first reaches
+    # them. The state cache is bounded: once it is full it gets flushed, and
+    # if flushes come faster than one per cache_size * min_chars_per_state
+    # scanned characters the executor gives up and falls back to the NFA.
+    # After retry_factor times that many characters on the NFA it tries the
+    # lazy DFA again, so one bad stretch of input is not fatal for good; the
+    # wait doubles every time it has to fall back again.
+    def __init__(self, nfa, cache_size=1024, min_chars_per_state=10, retry_factor=10):
+        self.nfa = nfa
+        self.nfa_executor = NFAExecutor(nfa)
+        self.cache_size = cache_size
+        self.min_chars_per_state = min_chars_per_state
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.fallback = False
+        self.fallbacks = 0
+        self.chars_since_flush = 0
+        self.fallback_chars = 0
+        self.retry_chars = retry_factor * cache_size * min_chars_per_state
+        self.start_states = frozenset(self.nfa_executor.epsilon_closure({nfa.start}))
+
+    def get_state(self, states, pending=0):
+        # pending is the number of characters the scan in progress has read,
+        # which are only added to chars_since_flush once it returns
+        state = self.cache.get(states)
+        if state is None:
+            if len(self.cache) >= self.cache_size:
+                self.flush(pending)
+            state = LazyDFAState(states, self.nfa.end in states)
+            self.cache[states] = state
+        return state
+
+    def flush(self, pending=0):
+        if self.chars_since_flush + pending < self.cache_size * self.min_chars_per_state:
+            if not self.fallback:
+                if self.fallbacks:
+                    self.retry_chars *= 2
+                self.fallback = True
+                self.fallbacks += 1
+                self.fallback_chars = 0
+        for state in self.cache.values():
+            state.transitions.clear()
+        self.cache.clear()
+        self.flushes += 1
+        # The pending characters were read before the flush; they are added
+        # back when the scan returns
+        self.chars_since_flush = -pending
+
+    def count_fallback(self, scanned):
+        # Characters matched on the NFA; enough of them end the fallback
+        self.fallback_chars += scanned
+        if self.fallback_chars >= self.retry_chars:
+            self.fallback = False
+            self.chars_since_flush = 0
+
+    def step(self, state, char, pending=0):
+        if char in state.transitions:
+            self.hits += 1
+            return state.transitions[char]
+        self.misses += 1
+        targets = self.nfa_executor.move(state.states, char)
+        if targets:
+            next_state = self.get_state(
+                frozenset(self.nfa_executor.epsilon_closure(targets)), pending
+            )
+        else:
+            next_state = None
+        state.transitions[char] = next_state
+        return next_state
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "states": len(self.cache),
+            "flushes": self.flushes,
+            "fallback": self.fallback,
+            "fallbacks": self.fallbacks,
+        }
+
+    def accepts(self, string):
+        if self.fallback:
+            self.count_fallback(len(string))
+            return self.nfa_executor.accepts(string)
+        state = self.get_state(self.start_states)
+        char_of = char_reader(string)
+        for i in range(len(string)):
+            state = self.step(state, char_of(string[i]), i)
+            if state is None:
+                break
+        self.chars_since_flush += len(string)
+        if state is not None and state.accepting:
+            return string
+        return None
+
+    def find_longest_match(self, string, start=0):
+        if self.fallback:
+            match, length = self.nfa_executor.find_longest_match(string, start)
+            self.count_fallback(max(length, 1))
+            return match, length
+        state = self.get_state(self.start_states)
+        char_of = char_reader(string)
+        last_match_pos = -1
+
+        scanned = 0
+        for i in range(start, len(string)):
+            scanned += 1
+            state = self.step(state, char_of(string[i]), scanned)
+            if state is None:
+                break
+            if state.accepting:
                 last_match_pos = i
+        self.chars_since_flush += scanned
 
         if last_match_pos >= 0:
-            return string[: last_match_pos + 1], last_match_pos + 1
+            return string[start : last_match_pos + 1], last_match_pos + 1 - start
         return None, 0
 
 
 class RegexEngine:
-    def __init__(self, regex):
+    # mode="dfa" runs on the subset-constructed (and by default minimized)
+    # DFA table, mode="lazy" builds DFA states on demand in a bounded cache,
+    # mode="nfa" keeps the plain NFA simulation as a reference.
+    def __init__(self, regex, mode="dfa", minimize=True, cache_size=1024):
         self.regex = regex
+        self.mode = mode
         self.parser = RegexParser(regex)
         self.ast = self.parser.parse()
         self.thompson = ThompsonConstruction(self.ast)
         self.nfa = self.thompson.build()
-        self.executor = NFAExecutor(self.nfa)
-        self.nfa.end.is_final = True
+        self.nfa_executor = NFAExecutor(self.nfa)
+        self.unminimized_state_count = None
+        if mode == "dfa":
+            self.dfa = SubsetConstruction(self.nfa).build()
+            self.unminimized_state_count = self.dfa.state_count
+            if minimize:
+                self.dfa = DFAMinimizer(self.dfa).minimize()
+            self.executor = DFAExecutor(self.dfa)
+        elif mode == "lazy":
+            self.dfa = None
+            self.executor = LazyDFAExecutor(self.nfa, cache_size=cache_size)
+        elif mode == "nfa":
+            self.dfa = None
+            self.executor = self.nfa_executor
+        else:
+            raise ValueError(f"Unknown regex engine mode: {mode}")
+
+    def state_counts(self):
+        return {
+            "nfa": self.nfa.state_count,
+            "dfa": self.unminimized_state_count,
+            "minimized_dfa": self.dfa.state_count if self.dfa else None,
+        }
+
+    def cache_stats(self):
+        if self.mode == "lazy":
+            return self.executor.stats()
+        return None
 
     def check_full_match(self, string):
         return self.executor.accepts(string)
 
-    def find_longest_match(self, string):
-        return self.executor.find_longest_match(string)
+    def find_longest_match(self, string, start=0):
+        # Matches at string[start:] without copying the tail of the string.
+        # string may be a str or a byte string; the match is a slice of it.
+        return self.executor.find_longest_match(string, start)
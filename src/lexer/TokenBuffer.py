@@ -0,0 +1,83 @@
+from array import array
+from bisect import bisect_right
+from .RegexEngine import text_slice
+
+
+class TokenBuffer:
+    # Columnar token store. Token i is kept as a kind id, a start offset and
+    # a length in parallel arrays; its text and (row, col) are only worked
+    # out when asked for. The source may be a str or a byte string.
+    #
+    # Positions follow Tokenizer.tokenize: rows only advance on newlines in
+    # skipped text and a skipped tab is 4 columns wide. The tokenizer records
+    # where each such row starts and where the skipped tabs are, so a
+    # location is two bisects instead of a walk over the source.
+    def __init__(self, source):
+        self.source = source
+        self.kind_names = []
+        self.kind_ids = {}
+        self.kinds = array("H")
+        self.starts = array("q")
+        self.lengths = array("i")
+        self.line_starts = array("q", [0])
+        self.tabs = array("q")
+
+    def kind_id(self, name):
+        kind = self.kind_ids.get(name)
+        if kind is None:
+            kind = self.kind_ids[name] = len(self.kind_names)
+            self.kind_names.append(name)
+        return kind
+
+    def append(self, name, start, length):
+        self.kinds.append(self.kind_id(name))
+        self.starts.append(start)
+        self.lengths.append(length)
+
+    def add_skipped(self, start, end):
+        # Records the newlines and tabs of skipped text source[start:end]
+        skipped = text_slice(self.source, start, end)
+        i = skipped.find("\n")
+        while i >= 0:
+            self.line_starts.append(start + i + 1)
+            i = skipped.find("\n", i + 1)
+        i = skipped.find("\t")
+        while i >= 0:
+            self.tabs.append(start + i)
+            i = skipped.find("\t", i + 1)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def kind(self, index):
+        return self.kind_names[self.kinds[index]]
+
+    def text(self, index):
+        start = self.starts[index]
+        return text_slice(self.source, start, start + self.lengths[index])
+
+    def location(self, index):
+        return self.offset_location(self.starts[index])
+
+    def offset_location(self, offset):
+        # (row, col) of a source offset that has been lexed up to
+        row = bisect_right(self.line_starts, offset)
+        line_start = self.line_starts[row - 1]
+        tabs = bisect_right(self.tabs, offset - 1) - bisect_right(self.tabs, line_start - 1)
+        return row, offset - line_start + 1 + 3 * tabs
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("token index out of range")
+        return (self.kind(index), self.text(index)) + self.location(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def memory_usage(self):
+        # Bytes held by the columns and indexes, not counting the source
+        columns = (self.kinds, self.starts, self.lengths, self.line_starts, self.tabs)
+        return sum(column.itemsize * len(column) for column in columns)
@@ -1,80 +1,693 @@
-from .RegexEngine import RegexEngine
+import hashlib
+import json
+import os
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from .RegexEngine import (
+    RegexParser,
+    ThompsonConstruction,
+    NFA,
+    DFA,
+    SubsetConstruction,
+    DFAMinimizer,
+    DFAExecutor,
+    code_reader,
+    text_slice,
+)
+from .TokenBuffer import TokenBuffer
+from .CharClassifier import CharClassifier
+
+# Bump when the layout of the cached lexer tables changes
+TABLE_FORMAT_VERSION = 2
+
+# Inputs shorter than this are not worth a NumPy pre-pass
+PREPASS_MIN_LENGTH = 1 << 14
 
 
 class TokenMatcher:
-    def __init__(self):
+    # All token and skip patterns are unioned into one tagged DFA, so every
+    # token costs a single longest-match scan no matter how many patterns
+    # are registered. Tags encode the resolution order: skip patterns first
+    # (in registration order), then token patterns by priority.
+    #
+    # Reserved words are not part of the automaton: a lexeme matched by a
+    # pattern is looked up in a keyword table and renamed when the reserved
+    # word outranks the pattern that matched it. Only lexemes with the tag
+    # and length of some reserved word are looked up, so most tokens are
+    # never sliced out of the source; byte input is looked up by bytes.
+    #
+    # Regexes are only compiled when the DFA is first needed. With a
+    # cache_dir the finished tables are stored on disk under a hash of the
+    # pattern set and loaded from there instead of being rebuilt.
+    def __init__(self, cache_dir=None):
         self.patterns = []
+        self.skip_patterns = []
+        self.reserved_groups = []
+        self.reserved = {}  # word -> (token_type, first tag it outranks)
+        self.reserved_bytes = {}  # the same, keyed by latin-1 bytes
+        self.reserved_lengths = {}  # tag -> lengths of the words it matches
+        self.scan_end = 0
+        self.cache_dir = cache_dir
+        self.dfa = None
+        self.executor = None
+        self.tag_names = []
+        self.skip_tag_count = 0
 
     def add_pattern(self, name, regex_str, priority=0):
-        engine = RegexEngine(regex_str)
-        self.patterns.append((priority, name, engine))
+        self.patterns.append((priority, name, regex_str))
         # Sort by priority (higher priority first)
         self.patterns.sort(key=lambda x: -x[0])
+        self.dfa = None
+
+    def add_skip_pattern(self, regex_str):
+        self.skip_patterns.append(regex_str)
+        self.dfa = None
+
+    def add_reserved_words(self, name, words, priority=0):
+        # Equal-priority patterns added earlier still rank above these words
+        earlier = sum(1 for pattern in self.patterns if pattern[0] == priority)
+        self.reserved_groups.append((priority, name, tuple(words), earlier))
+        self.dfa = None
+
+    def compile(self):
+        loaded = False
+        if self.cache_dir:
+            path = os.path.join(self.cache_dir, f"lexer-{self.cache_key()}.json")
+            try:
+                self.load_tables(path)
+                loaded = True
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        if not loaded:
+            self.build()
+            if self.cache_dir:
+                try:
+                    self.save_tables(path)
+                except OSError:
+                    pass
+        self.executor = DFAExecutor(self.dfa)
+        self.build_reserved()
+        return self.dfa
+
+    def build_reserved(self):
+        self.reserved = {}
+        self.reserved_bytes = {}
+        self.reserved_lengths = {}
+        groups = sorted(self.reserved_groups, key=lambda x: -x[0])
+        for priority, name, words, earlier in groups:
+            higher = sum(1 for pattern in self.patterns if pattern[0] > priority)
+            first_outranked = self.skip_tag_count + higher + earlier
+            for word in words:
+                token_type, length, skipped, exhausted = self.scan(word)
+                if skipped or length != len(word):
+                    raise ValueError(
+                        f"Reserved word '{word}' is not matched as a single token by any pattern"
+                    )
+                for tag, tag_name in enumerate(self.tag_names):
+                    if tag_name == token_type:
+                        self.reserved_lengths.setdefault(tag, set()).add(length)
+                entry = self.reserved.setdefault(word, (name, first_outranked))
+                try:
+                    self.reserved_bytes.setdefault(word.encode("latin-1"), entry)
+                except UnicodeEncodeError:
+                    pass  # never matches latin-1 decoded byte input
+
+    def build(self):
+        nfa = NFA()
+        nfa.start = nfa.add_state()
+        tags = {}
+        self.tag_names = []
+        regexes = [(None, regex_str) for regex_str in self.skip_patterns]
+        regexes += [(name, regex_str) for priority, name, regex_str in self.patterns]
+        for name, regex_str in regexes:
+            thompson = ThompsonConstruction(RegexParser(regex_str).parse(), nfa)
+            fragment_start, fragment_end = thompson.build_fragment()
+            nfa.add_epsilon(nfa.start, fragment_start)
+            tags[fragment_end] = len(self.tag_names)
+            self.tag_names.append(name)
+        self.skip_tag_count = len(self.skip_patterns)
+        dfa = SubsetConstruction(nfa, tags).build()
+        self.dfa = DFAMinimizer(dfa).minimize()
+        return self.dfa
+
+    def cache_key(self):
+        pattern_set = [TABLE_FORMAT_VERSION, self.skip_patterns, self.patterns]
+        return hashlib.sha256(json.dumps(pattern_set).encode()).hexdigest()[:32]
+
+    def spec_key(self):
+        # Covers everything that decides how a source is tokenized. Unlike
+        # cache_key it includes the reserved words, which are not in the DFA.
+        spec = [TABLE_FORMAT_VERSION, self.skip_patterns, self.patterns, self.reserved_groups]
+        return hashlib.sha256(json.dumps(spec).encode()).hexdigest()[:32]
+
+    def save_tables(self, path):
+        # The class map is stored as one string of characters per class id
+        classes = [""] * self.dfa.class_count
+        for code, class_id in enumerate(self.dfa.classmap):
+            if class_id:
+                classes[class_id] += chr(code)
+        tables = {
+            "key": self.cache_key(),
+            "tag_names": self.tag_names,
+            "skip_tag_count": self.skip_tag_count,
+            "start": self.dfa.start,
+            "accepting": self.dfa.accepting,
+            "classes": classes,
+            "table": self.dfa.table.tolist(),
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(tables, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    def load_tables(self, path):
+        with open(path, "r") as f:
+            tables = json.load(f)
+        if tables["key"] != self.cache_key():
+            raise ValueError(f"Lexer table cache '{path}' is stale")
+        classes = tables["classes"]
+        size = max((ord(char) for chars in classes for char in chars), default=-1) + 1
+        classmap = array("i", [0]) * size
+        for class_id, chars in enumerate(classes):
+            for char in chars:
+                classmap[ord(char)] = class_id
+        dfa = DFA(classmap, len(classes))
+        dfa.start = tables["start"]
+        dfa.accepting = tables["accepting"]
+        dfa.table = array("i", tables["table"])
+        if len(dfa.table) != len(dfa.accepting) * dfa.class_count:
+            raise ValueError(f"Lexer table cache '{path}' is corrupt")
+        self.tag_names = tables["tag_names"]
+        self.skip_tag_count = tables["skip_tag_count"]
+        self.dfa = dfa
+        return self.dfa
 
-    def match(self, string):
-        longest_match = None
-        longest_length = 0
-        token_type = None
+    def match(self, string, start=0):
+        # Returns (token_type, matched, length) for the match at string[start:].
+        # A skip match is reported as (None, None, length); it wins over any
+        # token match at the same position.
+        token_type, length, skipped, exhausted = self.scan(string, start)
+        if skipped:
+            return None, None, length
+        if token_type:
+            return token_type, text_slice(string, start, start + length), length
+        return None, None, 0
 
-        for priority, name, engine in self.patterns:
-            matched, length = engine.find_longest_match(string)
-            if matched and length > longest_length:
-                longest_match = matched
-                longest_length = length
-                token_type = name
+    def scan(self, string, start=0):
+        # Returns (token_type, length, skipped, exhausted). exhausted is True
+        # when the automaton was still alive at the end of the string, i.e.
+        # more input could still extend the match. Afterwards scan_end is one
+        # past the last index the scan looked at (len(string) + 1 when it ran
+        # into the end of the string).
+        if self.dfa is None:
+            self.compile()
+        dfa = self.dfa
+        table = self.executor.table
+        classmap = self.executor.classmap
+        width = dfa.class_count
+        accepting = dfa.accepting
+        skip_tag_count = self.skip_tag_count
+        code_of = code_reader(string)
+        state = dfa.start
+        skip_length = 0
+        token_length = 0
+        token_tag = None
 
-        return token_type, longest_match, longest_length
+        exhausted = True
+        for i in range(start, len(string)):
+            try:
+                state = table[state * width + classmap[code_of(string[i])]]
+            except IndexError:
+                state = -1
+            if state < 0:
+                exhausted = False
+                self.scan_end = i + 1
+                break
+            tag = accepting[state]
+            if tag is None:
+                continue
+            if tag < skip_tag_count:
+                skip_length = i + 1 - start
+            else:
+                token_length = i + 1 - start
+                token_tag = tag
+        if exhausted:
+            self.scan_end = len(string) + 1
+
+        if skip_length:
+            return None, skip_length, True, exhausted
+        if token_length:
+            token_type = self.tag_names[token_tag]
+            lengths = self.reserved_lengths.get(token_tag)
+            if lengths is not None and token_length in lengths:
+                end = start + token_length
+                if isinstance(string, str):
+                    reserved = self.reserved.get(string[start:end])
+                else:
+                    reserved = self.reserved_bytes.get(bytes(string[start:end]))
+                if reserved is not None and token_tag >= reserved[1]:
+                    token_type = reserved[0]
+            return token_type, token_length, False, exhausted
+        return None, 0, False, exhausted
+
+
+# Tokenizer used by tokenize_parallel worker processes
+_worker_tokenizer = None
+
+
+def _init_worker(tokenizer):
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer
+
+
+def _tokenize_chunk(args):
+    chunk, final = args
+    return _worker_tokenizer.tokenize_chunk(chunk, final)
 
 
 class Tokenizer:
-    def __init__(self):
-        self.matcher = TokenMatcher()
-        self.skip_patterns = []
+    # With prepass (and NumPy installed) tokenize and tokenize_buffer find
+    # the skip runs of large inputs up front with a CharClassifier and only
+    # run the DFA from token starts.
+    def __init__(self, cache_dir=None, prepass=True):
+        self.matcher = TokenMatcher(cache_dir)
+        self.prepass = prepass
+        self.classifier = None
 
     def add_pattern(self, name, regex_str, priority=0):
         self.matcher.add_pattern(name, regex_str, priority)
         return self
 
     def add_skip_pattern(self, regex_str):
-        self.skip_patterns.append(RegexEngine(regex_str))
+        self.matcher.add_skip_pattern(regex_str)
         return self
 
+    def add_reserved_words(self, name, words, priority=0):
+        # Words are scanned by the other patterns (typically an identifier
+        # pattern) and reclassified through a keyword table, with the same
+        # priority rules as add_pattern.
+        self.matcher.add_reserved_words(name, words, priority)
+        return self
+
+    @staticmethod
+    def skip_position(input_str, i, end, row, col):
+        # Row/col after skipping input_str[i:end]
+        if not isinstance(input_str, str):
+            input_str, i, end = text_slice(input_str, i, end), 0, end - i
+        newlines = input_str.count("\n", i, end)
+        if newlines:
+            # Columns restart after the last newline of the skipped run
+            row += newlines
+            i = input_str.rfind("\n", i, end) + 1
+            col = 1
+        # Tabs advance the column by 4, every other character by 1
+        col += end - i + 3 * input_str.count("\t", i, end)
+        return row, col
+
+    def skip_runs(self, input_str):
+        # (starts, ends) of the skip runs found by the pre-pass, or two empty
+        # lists to leave all skipping to the DFA
+        if (
+            not self.prepass
+            or len(input_str) < PREPASS_MIN_LENGTH
+            or not CharClassifier.available()
+        ):
+            return [], []
+        if self.classifier is None or self.classifier.dfa is not self.matcher.dfa:
+            self.classifier = CharClassifier(self.matcher)
+        if not self.classifier.usable:
+            return [], []
+        return self.classifier.skip_runs(input_str)
+
     def tokenize(self, input_str):
+        # input_str may also be a byte string such as bytes or an mmap, in
+        # which case it is lexed in place; the token texts are str either way.
         tokens = []
         i = 0
         row = 1
         col = 1
+        run_starts, run_ends = self.skip_runs(input_str)
+        run = 0
+        run_count = len(run_starts)
 
         while i < len(input_str):
-            skipped = False
-            for skip_engine in self.skip_patterns:
-                matched, length = skip_engine.find_longest_match(input_str[i:])
-                if matched:
-                    for char in matched:
-                        if char == "\n":
-                            row += 1
-                            col = 1
-                        else:
-                            if char == "\t":
-                                col += 4
-                            else:
-                                col += 1
-                    i += length
-                    skipped = True
-                    break
-
-            if skipped:
+            if run < run_count and run_starts[run] <= i:
+                end = run_ends[run]
+                row, col = self.skip_position(input_str, i, end, row, col)
+                i = end
+                run += 1
                 continue
 
-            token_type, matched, length = self.matcher.match(input_str[i:])
+            token_type, matched, length = self.matcher.match(input_str, i)
 
             if token_type:
                 tokens.append((token_type, matched, row, col))
                 col += length
                 i += length
+                # Drop runs that lay inside the token
+                while run < run_count and run_ends[run] <= i:
+                    run += 1
+            elif length:
+                row, col = self.skip_position(input_str, i, i + length, row, col)
+                i += length
+            else:
+                raise SyntaxError(
+                    f"Invalid character: {text_slice(input_str, i, i + 1)} at row {row}, col {col}"
+                )
+
+        return tokens
+
+    def tokenize_buffer(self, input_str):
+        # Like tokenize, but returns a TokenBuffer instead of a list of
+        # tuples. Row/col are not tracked while lexing; the buffer derives
+        # them from the newlines and tabs of the skipped text on demand.
+        # Byte strings are accepted as in tokenize; with an mmap nothing but
+        # the token columns is ever copied out of the file.
+        buffer = TokenBuffer(input_str)
+        scan = self.matcher.scan
+        append = buffer.append
+        add_skipped = buffer.add_skipped
+        i = 0
+        run_starts, run_ends = self.skip_runs(input_str)
+        run = 0
+        run_count = len(run_starts)
+
+        while i < len(input_str):
+            if run < run_count and run_starts[run] <= i:
+                end = run_ends[run]
+                add_skipped(i, end)
+                i = end
+                run += 1
+                continue
+
+            token_type, length, skipped, exhausted = scan(input_str, i)
+            if token_type:
+                append(token_type, i, length)
+                while run < run_count and run_ends[run] <= i + length:
+                    run += 1
+            elif skipped:
+                add_skipped(i, i + length)
+            else:
+                row, col = buffer.offset_location(i)
+                raise SyntaxError(
+                    f"Invalid character: {text_slice(input_str, i, i + 1)} at row {row}, col {col}"
+                )
+            i += length
+
+        return buffer
+
+    def scan_tokens(self, input_str, i=0, row=1, col=1):
+        # Like tokenize, starting at offset i with the given row/col. Yields
+        # (token, start, reach) where reach is one past the furthest index
+        # looked at while lexing the token and the skipped text before it.
+        matcher = self.matcher
+        reach = 0
+        while i < len(input_str):
+            token_type, length, skipped, exhausted = matcher.scan(input_str, i)
+            reach = max(reach, matcher.scan_end)
+            if token_type:
+                yield (token_type, text_slice(input_str, i, i + length), row, col), i, reach
+                reach = 0
+                col += length
+                i += length
+            elif skipped:
+                row, col = self.skip_position(input_str, i, i + length, row, col)
+                i += length
+            else:
+                raise SyntaxError(
+                    f"Invalid character: {text_slice(input_str, i, i + 1)} at row {row}, col {col}"
+                )
+
+    def tokenize_chunk(self, chunk, final=False):
+        # Tokenizes one chunk of a larger input with row/col relative to the
+        # chunk start. Unless final, a lexeme that runs into the end of the
+        # chunk is left out since more input could change it. Returns
+        # (types, starts, lengths, rows, cols, stop, error): the token
+        # columns, the offset lexing stopped at and whether chunk[stop] is an
+        # invalid character. Lexemes are left to the caller to slice, which
+        # keeps the result cheap to send between processes.
+        matcher = self.matcher
+        types = []
+        starts = array("i")
+        lengths = array("i")
+        rows = array("i")
+        cols = array("i")
+        i = 0
+        row = 1
+        col = 1
+
+        while i < len(chunk):
+            token_type, length, skipped, exhausted = matcher.scan(chunk, i)
+            if exhausted and not final:
+                break
+            if token_type:
+                types.append(token_type)
+                starts.append(i)
+                lengths.append(length)
+                rows.append(row)
+                cols.append(col)
+                col += length
+                i += length
+            elif skipped:
+                row, col = self.skip_position(chunk, i, i + length, row, col)
+                i += length
             else:
+                return types, starts, lengths, rows, cols, i, True
+
+        return types, starts, lengths, rows, cols, i, False
+
+    def split_points(self, input_str, chunk_size):
+        # Chunks start right after a newline. Any start is correct since
+        # tokenize_parallel re-lexes across mismatched boundaries, but a
+        # newline that the skip patterns consume on its own is almost
+        # always a lexeme boundary.
+        token_type, length, skipped, exhausted = self.matcher.scan("\n")
+        if not skipped:
+            return [0]
+        points = [0]
+        target = chunk_size
+        while target < len(input_str):
+            newline = input_str.find("\n", target)
+            if newline < 0 or newline + 1 >= len(input_str):
+                break
+            points.append(newline + 1)
+            target = newline + 1 + chunk_size
+        return points
+
+    def tokenize_parallel(self, input_str, workers=None, chunk_size=1 << 20):
+        # Same output as tokenize, with the chunks lexed in a process pool
+        # and stitched back together with absolute row/col.
+        self.matcher.compile()
+        points = self.split_points(input_str, chunk_size)
+        if len(points) < 2:
+            return self.tokenize(input_str)
+
+        bounds = points + [len(input_str)]
+        jobs = [
+            (input_str[bounds[k] : bounds[k + 1]], k == len(points) - 1)
+            for k in range(len(points))
+        ]
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(self,)
+        ) as pool:
+            results = list(pool.map(_tokenize_chunk, jobs))
+
+        tokens = []
+        pos = 0
+        row = 1
+        col = 1
+        serial = None  # serial lexer from pos while out of step with the chunks
+        for chunk_start, result in zip(points, results):
+            types, starts, lengths, rows, cols, stop, error = result
+            if serial is None and pos == chunk_start:
+                index, anchor_row, anchor_col, chunk_row, chunk_col = 0, row, col, 1, 1
+            else:
+                # The chunk began mid-lexeme. Lex serially until a token
+                # starts where one of the chunk's tokens does, from there
+                # on both agree.
+                if serial is None:
+                    serial = self.scan_tokens(input_str, pos, row, col)
+                chunk_starts = {start: index for index, start in enumerate(starts)}
+                index = None
+                for token, start, reach in serial:
+                    index = chunk_starts.get(start - chunk_start)
+                    if index is not None:
+                        anchor_row, anchor_col = token[2], token[3]
+                        chunk_row, chunk_col = rows[index], cols[index]
+                        serial = None
+                        break
+                    tokens.append(token)
+                    if start >= chunk_start + stop:
+                        break
+                else:
+                    # The serial lexer reached the end of the input
+                    return tokens
+                if index is None:
+                    continue
+
+            # Chunk row/col -> absolute, relative to the anchor token
+            row_shift = anchor_row - chunk_row
+            col_shift = anchor_col - chunk_col
+            for k in range(index, len(types)):
+                start = chunk_start + starts[k]
+                token_row = rows[k]
+                token_col = cols[k]
+                if token_row == chunk_row:
+                    token_col += col_shift
+                tokens.append(
+                    (types[k], input_str[start : start + lengths[k]], token_row + row_shift, token_col)
+                )
+            if index < len(types):
+                pos = chunk_start + starts[-1] + lengths[-1]
+                row, col = tokens[-1][2], tokens[-1][3] + lengths[-1]
+            # Skipped text between the last token and stop
+            row, col = self.skip_position(input_str, pos, chunk_start + stop, row, col)
+            pos = chunk_start + stop
+            if error:
                 raise SyntaxError(
-                    f"Invalid character: {input_str[i]} at row {row}, col {col}"
+                    f"Invalid character: {input_str[pos]} at row {row}, col {col}"
                 )
 
+        if serial is not None:
+            tokens.extend(token for token, start, reach in serial)
         return tokens
+
+    def tokenize_stream(self, file, chunk_size=65536):
+        # Generator version of tokenize that reads file in chunks. A match
+        # that runs into the end of the buffer is rescanned once more input
+        # is available, so tokens straddling chunk boundaries are handled.
+        buffer = ""
+        i = 0
+        row = 1
+        col = 1
+        eof = False
+
+        while True:
+            if i >= len(buffer):
+                if eof:
+                    return
+                buffer = file.read(chunk_size)
+                i = 0
+                eof = not buffer
+                continue
+
+            token_type, length, skipped, exhausted = self.matcher.scan(buffer, i)
+            if exhausted and not eof:
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[i:] + chunk
+                i = 0
+                continue
+
+            if token_type:
+                yield (token_type, buffer[i : i + length], row, col)
+                col += length
+                i += length
+            elif skipped:
+                row, col = self.skip_position(buffer, i, i + length, row, col)
+                i += length
+            else:
+                raise SyntaxError(
+                    f"Invalid character: {buffer[i]} at row {row}, col {col}"
+                )
+
+
+class IncrementalTokenizer:
+    # Keeps the token list of a source text up to date under edits. Each
+    # token remembers its start offset and how far lexing it looked ahead
+    # (reach, kept as a running maximum), so an edit only re-lexes from the
+    # last token whose lexing never looked at the edited text, and stops as
+    # soon as a new token starts where an old one did after the edit.
+    #
+    # After each edit, changed is (first, old_end, new_end): old tokens
+    # [first, old_end) were replaced by the new tokens [first, new_end).
+    def __init__(self, tokenizer, source):
+        self.tokenizer = tokenizer
+        self.source = source
+        self.tokens = []
+        self.starts = []
+        self.reach = []
+        self.changed = None
+        self.relex(0, 0, None)
+
+    def relex(self, keep, delta, edit_end):
+        # Re-lexes self.source from after token keep - 1. With edit_end set,
+        # stops at the first token starting at or after edit_end (new
+        # offsets) that lines up with an old token start shifted by delta.
+        old_tokens, old_starts, old_reach = self.tokens, self.starts, self.reach
+        tokens, starts, reach = old_tokens[:keep], old_starts[:keep], old_reach[:keep]
+        if keep:
+            token_type, text, row, col = tokens[-1]
+            i, col = starts[-1] + len(text), col + len(text)
+        else:
+            i, row, col = 0, 1, 1
+        max_reach = reach[-1] if reach else 0
+
+        old_index = keep
+        resynced = None
+        for token, start, token_reach in self.tokenizer.scan_tokens(self.source, i, row, col):
+            if edit_end is not None and start >= edit_end:
+                old_start = start - delta
+                while old_index < len(old_starts) and old_starts[old_index] < old_start:
+                    old_index += 1
+                if old_index < len(old_starts) and old_starts[old_index] == old_start:
+                    resynced = token
+                    break
+            max_reach = max(max_reach, token_reach)
+            tokens.append(token)
+            starts.append(start)
+            reach.append(max_reach)
+
+        old_end = len(old_tokens) if resynced is None else old_index
+        first = keep
+        # Re-lexed tokens identical to the old ones did not change
+        while first < min(old_end, len(tokens)) and tokens[first] == old_tokens[first]:
+            first += 1
+        self.changed = (first, old_end, len(tokens))
+
+        if resynced is not None:
+            row_shift = resynced[2] - old_tokens[old_index][2]
+            col_shift = resynced[3] - old_tokens[old_index][3]
+            first_row = old_tokens[old_index][2]
+            index = old_index
+            # Only tokens on the resync row move sideways
+            while index < len(old_tokens) and old_tokens[index][2] == first_row:
+                token_type, text, row, col = old_tokens[index]
+                tokens.append((token_type, text, row + row_shift, col + col_shift))
+                index += 1
+            if row_shift:
+                tokens.extend(
+                    (token_type, text, row + row_shift, col)
+                    for token_type, text, row, col in old_tokens[index:]
+                )
+            else:
+                tokens.extend(old_tokens[index:])
+            starts.extend(start + delta for start in old_starts[old_index:])
+            reach.extend(
+                max(max_reach, token_reach + delta) for token_reach in old_reach[old_index:]
+            )
+
+        self.tokens, self.starts, self.reach = tokens, starts, reach
+
+    def edit(self, offset, removed_length, inserted_text):
+        # Replaces source[offset:offset + removed_length] with inserted_text
+        # and returns the updated token list.
+        if offset < 0 or removed_length < 0 or offset + removed_length > len(self.source):
+            raise ValueError(
+                f"Edit out of range: offset {offset}, removed length {removed_length}"
+            )
+        old_source = self.source
+        self.source = (
+            old_source[:offset] + inserted_text + old_source[offset + removed_length :]
+        )
+        # Tokens whose lexing never looked at index offset or later stay
+        keep = bisect_right(self.reach, offset)
+        delta = len(inserted_text) - removed_length
+        try:
+            self.relex(keep, delta, offset + len(inserted_text))
+        except SyntaxError:
+            self.source = old_source
+            raise
+        return self.tokens
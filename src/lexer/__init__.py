@@ -4,9 +4,14 @@ Lexer Module
 This module contains lexical analysis components:
 - RegexEngine: Regular expression matching engine
 - Tokenizer: Converts source code into tokens
+- TokenBuffer: Compact columnar token store with lazy lexemes and positions
+- CharClassifier: Optional NumPy pre-pass that finds skip runs up front
+- IncrementalTokenizer: Keeps a token list up to date under text edits
 """
 
 from .RegexEngine import RegexEngine
-from .Tokenizer import Tokenizer
+from .Tokenizer import Tokenizer, IncrementalTokenizer
+from .TokenBuffer import TokenBuffer
+from .CharClassifier import CharClassifier
 
-__all__ = ['RegexEngine', 'Tokenizer']
\ No newline at end of file
+__all__ = ['RegexEngine', 'Tokenizer', 'IncrementalTokenizer', 'TokenBuffer', 'CharClassifier']
\ No newline at end of file
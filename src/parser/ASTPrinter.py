@@ -0,0 +1,60 @@
+from utils import Visitor
+
+
+class ASTPrinter(Visitor):
+    # Prints an AST one node per line, indented by depth. Each visit method
+    # returns the node's line and its children; print walks the tree with an
+    # explicit stack instead of recursing, so the printable depth is not
+    # bounded by the recursion limit.
+
+    def print(self, node, indent=0):
+        stack = [(node, indent)]
+        while stack:
+            node, indent = stack.pop()
+            line, children = self.visit(node)
+            if line is not None:
+                print(f"{'  ' * indent}{line}")
+            # Children go on the stack last-first so they print in order
+            for child in reversed(children):
+                stack.append((child, indent + 1))
+
+    def generic_visit(self, node):
+        # Nodes the printer does not know are skipped
+        return None, ()
+
+    def visit_ProgramNode(self, node):
+        return "Program:", (node.scope,)
+
+    def visit_ScopeNode(self, node):
+        return "Scope:", node.statements
+
+    def visit_DefinerNode(self, node):
+        if node.value:
+            return f"Definer: var {node.name} =", (node.value,)
+        return f"Definer: var {node.name}", ()
+
+    def visit_EqualizeNode(self, node):
+        return f"Equalize: {node.name} =", (node.value,)
+
+    def visit_IfNode(self, node):
+        return "If:", (node.condition, node.scope)
+
+    def visit_WhileNode(self, node):
+        return "While:", (node.condition, node.scope)
+
+    def visit_PrintNode(self, node):
+        return "Print:", (node.expression,)
+
+    def visit_ConditionNode(self, node):
+        return f"Condition: {node.operator}", (node.left, node.right)
+
+    def visit_ExpressionNode(self, node):
+        return f"Expression: {node.operator}", (node.left, node.right)
+
+    def visit_TermNode(self, node):
+        return f"Term: {node.operator}", (node.left, node.right)
+
+    def visit_FactorNode(self, node):
+        if node.is_variable:
+            return f"Var: {node.value}", ()
+        return f"Num: {node.value}", ()
@@ -0,0 +1,140 @@
+from lexer import IncrementalTokenizer
+from utils import Visitor
+from .Parser import Parser
+
+
+class NestedScope(Visitor):
+    # The scope a statement opens: a block is its own scope, if and while
+    # statements have their body, anything else has none
+    def generic_visit(self, node):
+        return None
+
+    def visit_ScopeNode(self, node):
+        return node
+
+    def visit_IfNode(self, node):
+        return node.scope
+
+    visit_WhileNode = visit_IfNode
+
+
+class SpanChildren(Visitor):
+    # The children of a scope or statement node that carry token spans
+    def generic_visit(self, node):
+        return ()
+
+    def visit_ScopeNode(self, node):
+        return node.statements
+
+    def visit_IfNode(self, node):
+        return (node.scope,)
+
+    visit_WhileNode = visit_IfNode
+
+
+class IncrementalParser:
+    # Keeps the AST of a source text up to date under edits. The tokens are
+    # maintained by an IncrementalTokenizer; after an edit only the innermost
+    # scope whose braces enclose every changed token is parsed again and put
+    # in place of the old one. Every other subtree is reused, with the token
+    # spans of the nodes after the edit shifted.
+    #
+    # When the re-parsed scope does not end where it used to (the edit moved
+    # its closing brace) or fails to parse, the next enclosing scope is tried,
+    # and finally the whole program. reparsed is the subtree built by the
+    # last edit, i.e. the part of the AST that needs analyzing again.
+    def __init__(self, tokenizer, source, parser_class=Parser):
+        self.lexer = IncrementalTokenizer(tokenizer, source)
+        self.parser_class = parser_class
+        self.nested_scope = NestedScope()
+        self.span_children = SpanChildren()
+        self.ast = None
+        self.reparsed = None
+        self.parse_all()
+
+    @property
+    def source(self):
+        return self.lexer.source
+
+    def parse_all(self):
+        self.ast = None
+        self.ast = self.parser_class(self.lexer.tokens).parse_program()
+        self.reparsed = self.ast.scope
+        return self.ast
+
+    def edit(self, offset, removed_length, inserted_text):
+        # Replaces source[offset:offset + removed_length] with inserted_text
+        # and returns the updated AST. Raises SyntaxError if the new source
+        # does not parse; the next edit then starts from a full parse.
+        self.lexer.edit(offset, removed_length, inserted_text)
+        if self.ast is None:
+            return self.parse_all()
+        first, old_end, new_end = self.lexer.changed
+        delta = new_end - old_end
+
+        for scope, holder, key in reversed(self.enclosing_scopes(first, old_end)):
+            start, end = scope.span
+            try:
+                node = self.parser_class(self.lexer.tokens).parse_scope_at(start)
+            except SyntaxError:
+                continue
+            if node.span[1] != end + delta:
+                continue
+            if isinstance(holder, list):
+                holder[key] = node
+            else:
+                setattr(holder, key, node)
+            self.shift_spans(node, old_end, delta)
+            self.reparsed = node
+            return self.ast
+        return self.parse_all()
+
+    def enclosing_scopes(self, first, old_end):
+        # Scopes whose braces enclose old tokens [first, old_end), outermost
+        # first, as (scope, holder, key) with holder[key] (or the holder's
+        # attribute key) being where the scope is referenced from
+        path = []
+        holder, key, scope = self.ast, "scope", self.ast.scope
+        while scope is not None:
+            start, end = scope.span
+            if not (start < first and old_end < end):
+                break
+            path.append((scope, holder, key))
+            statements = scope.statements
+            index = self.statement_at(statements, first)
+            scope = None
+            if index is not None and statements[index].span[1] > old_end:
+                statement = statements[index]
+                scope = self.nested_scope.visit(statement)
+                if scope is statement:
+                    holder, key = statements, index
+                elif scope is not None:
+                    holder, key = statement, "scope"
+        return path
+
+    @staticmethod
+    def statement_at(statements, position):
+        # Index of the last statement starting at or before token position
+        low, high = 0, len(statements)
+        while low < high:
+            middle = (low + high) // 2
+            if statements[middle].span[0] <= position:
+                low = middle + 1
+            else:
+                high = middle
+        return low - 1 if low else None
+
+    def shift_spans(self, reparsed, old_end, delta):
+        # Moves the spans of every scope and statement node ending after
+        # old_end by delta tokens (only the end for nodes enclosing the
+        # edit). The freshly parsed subtree already has the right spans.
+        if not delta:
+            return
+        stack = [self.ast.scope]
+        while stack:
+            node = stack.pop()
+            start, end = node.span
+            if end <= old_end or node is reparsed:
+                continue
+            node.span = (start + delta if start >= old_end else start, end + delta)
+            stack.extend(self.span_children.visit(node))
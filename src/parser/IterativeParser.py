@@ -0,0 +1,190 @@
+from .Parser import (
+    Parser,
+    binary_operators,
+    LOGICAL,
+    CONDITIONAL,
+    ADDITIVE,
+    MULTIPLICATIVE,
+)
+from .parserNodes import (
+    ProgramNode,
+    ScopeNode,
+    DefinerNode,
+    EqualizeNode,
+    IfNode,
+    WhileNode,
+    PrintNode,
+    FactorNode,
+)
+
+
+class IterativeParser(Parser):
+    # Same grammar, ASTs and errors as Parser, without recursion. Every rule
+    # is a generator that yields the generator of the rule it needs parsed
+    # next and is sent the resulting node back; run drives them from an
+    # explicit stack, so nesting depth is limited only by memory.
+
+    def parse_program(self):
+        # <program> ::= <scope>
+        return ProgramNode(self.run(self.parse_scope()))
+
+    def parse_scope_at(self, position):
+        self.tokens.position = position
+        return self.run(self.parse_scope())
+
+    def run(self, rule):
+        # Drives the generator of a rule and the rules it asks for to
+        # completion and returns its node
+        stack = [rule]
+        node = None
+        while stack:
+            try:
+                rule = stack[-1].send(node)
+            except StopIteration as done:
+                stack.pop()
+                node = done.value
+                continue
+            stack.append(rule)
+            node = None
+        return node
+
+    def parse_scope(self):
+        # <scope> ::= "{" <statement>+ "}"
+        start = self.tokens.position
+        self.tokens.consume("{", "SYMBOL")
+        statements = []
+        while self.tokens.peek_value() not in (None, "}"):
+            statements.append((yield self.parse_statement()))
+        self.tokens.consume("}", "SYMBOL")
+        node = ScopeNode(statements)
+        node.span = (start, self.tokens.position)
+        return node
+
+    def parse_statement(self):
+        # <statement> ::= <definer> | <equalize> | <if_structure> | <print> | <while_structure> | <scope>
+        start = self.tokens.position
+        value = self.tokens.peek_value()
+        if value == "var":
+            rule = self.parse_definer()
+        elif value == "if":
+            rule = self.parse_if_structure()
+        elif value == "while":
+            rule = self.parse_while_structure()
+        elif value == "print":
+            rule = self.parse_print()
+        elif value == "{":
+            rule = self.parse_scope()
+        else:
+            rule = self.parse_equalize()
+        node = yield rule
+        node.span = (start, self.tokens.position)
+        return node
+
+    def parse_definer(self):
+        # <definer>::= ( "var" <type> <var> ";" ) | ( "var" <type> <var> "=" <expression> ";" )
+        self.tokens.consume("var", "KEYWORD")
+        var_type = self.tokens.consume(expected_type="TYPE")
+        var_name = self.tokens.consume(expected_type="IDENTIFIER")
+        value = None
+        if self.tokens.peek_value() == "=":
+            self.tokens.consume("=", "SYMBOL")
+            value = yield self.parse_expression()
+        self.tokens.consume(";", "SYMBOL")
+        return DefinerNode(var_name, value, var_type)
+
+    def parse_equalize(self):
+        # <equalize>::= <var> "=" <expression> ";"
+        var_name = self.tokens.consume(expected_type="IDENTIFIER")
+        self.tokens.consume("=", "SYMBOL")
+        value = yield self.parse_expression()
+        self.tokens.consume(";", "SYMBOL")
+        return EqualizeNode(var_name, value)
+
+    def parse_if_structure(self):
+        # <if_structure> ::= "if" <condition> "do" <scope>
+        self.tokens.consume("if", "KEYWORD")
+        condition = yield self.parse_condition()
+        self.tokens.consume("do", "KEYWORD")
+        scope = yield self.parse_scope()
+        return IfNode(condition, scope)
+
+    def parse_while_structure(self):
+        # <while_structure> ::= "while" <condition> "do" <scope>
+        self.tokens.consume("while", "KEYWORD")
+        condition = yield self.parse_condition()
+        self.tokens.consume("do", "KEYWORD")
+        scope = yield self.parse_scope()
+        return WhileNode(condition, scope)
+
+    def parse_print(self):
+        # <print> ::= "print" "(" <expression> ")" ";"
+        self.tokens.consume("print", "KEYWORD")
+        self.tokens.consume("(", "SYMBOL")
+        expression = yield self.parse_expression()
+        self.tokens.consume(")", "SYMBOL")
+        self.tokens.consume(";", "SYMBOL")
+        return PrintNode(expression)
+
+    def parse_condition(self):
+        # <condition> ::= <expression> | <expression> <conditional_operator> <expression> | "(" <condition> ")" <logical_operator> "(" <condition> ")"
+        if self.tokens.peek_value() == "(":
+            node = yield self.parse_condition_group()
+            return (yield self.parse_binary(node, LOGICAL, LOGICAL))
+        node = yield self.parse_factor()
+        return (yield self.parse_binary(node, CONDITIONAL))
+
+    def parse_condition_group(self):
+        # "(" <condition> ")"
+        self.tokens.consume("(", "SYMBOL")
+        node = yield self.parse_condition()
+        self.tokens.consume(")", "SYMBOL")
+        return node
+
+    def parse_expression(self):
+        # <expression> ::= <term> (("+" | "-") <term>)*
+        # <term> ::= <factor> (("*" | "/") <factor>)*
+        node = yield self.parse_factor()
+        return (yield self.parse_binary(node, ADDITIVE))
+
+    def parse_binary(self, node, min_precedence, max_precedence=MULTIPLICATIVE):
+        # Precedence climbing over binary_operators, as in Parser
+        while True:
+            entry = binary_operators.get(self.tokens.peek_value())
+            if entry is None:
+                return node
+            precedence, token_type, node_type, chains = entry
+            if not min_precedence <= precedence <= max_precedence:
+                return node
+            operator = self.tokens.consume(expected_type=token_type)
+            if precedence == LOGICAL:
+                right = yield self.parse_condition_group()
+            else:
+                right = yield self.parse_factor()
+                if precedence < MULTIPLICATIVE:
+                    right = yield self.parse_binary(right, precedence + 1)
+            node = node_type(node, operator, right)
+            if not chains:
+                return node
+
+    def parse_factor(self):
+        # <factor> ::= <var> | <signed_number> | "(" <expression> ")"
+        token_type = self.tokens.peek_type()
+        if self.tokens.peek_value() == "(":
+            self.tokens.consume("(", "SYMBOL")
+            node = yield self.parse_expression()
+            self.tokens.consume(")", "SYMBOL")
+            return node
+        elif token_type == "IDENTIFIER":
+            var_name = self.tokens.consume(expected_type="IDENTIFIER")
+            return FactorNode(var_name, is_variable=True)
+        elif token_type in ("NUMBER", "SIGNED_NUMBER"):
+            number = self.tokens.consume(expected_type=token_type)
+            return FactorNode(number, is_variable=False)
+        elif token_type == "BOOLEAN":
+            boolean = self.tokens.consume(expected_type="BOOLEAN")
+            return FactorNode(boolean, is_variable=False)
+        else:
+            token = self.tokens.peek()
+            raise SyntaxError(
+                f"Error, expected '(', 'IDENTIFIER', 'NUMBER', 'SIGNED_NUMBER', or 'BOOLEAN' but found '{token[1]}' at row {token[2]}, column {token[3]}"
+            )
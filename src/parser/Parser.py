@@ -35,25 +35,133 @@ from .parserNodes import (
     TermNode,
     FactorNode,
 )
+from .ASTPrinter import ASTPrinter
+
+# Precedence levels of the binary operators, loosest first
+LOGICAL = 1
+CONDITIONAL = 2
+ADDITIVE = 3
+MULTIPLICATIVE = 4
+
+# operator -> (precedence, token type, node class, chains). A chaining
+# operator is left-associative; a non-chaining one takes a single right
+# operand and ends the (sub)expression.
+binary_operators = {
+    "&": (LOGICAL, "LOGICAL_OPERATOR", ConditionNode, True),
+    "|": (LOGICAL, "LOGICAL_OPERATOR", ConditionNode, True),
+    "<": (CONDITIONAL, "CONDITIONAL_OPERATOR", ConditionNode, False),
+    ">": (CONDITIONAL, "CONDITIONAL_OPERATOR", ConditionNode, False),
+    "==": (CONDITIONAL, "CONDITIONAL_OPERATOR", ConditionNode, False),
+    "<=": (CONDITIONAL, "CONDITIONAL_OPERATOR", ConditionNode, False),
+    ">=": (CONDITIONAL, "CONDITIONAL_OPERATOR", ConditionNode, False),
+    "!=": (CONDITIONAL, "CONDITIONAL_OPERATOR", ConditionNode, False),
+    "+": (ADDITIVE, "OPERATOR", ExpressionNode, True),
+    "-": (ADDITIVE, "OPERATOR", ExpressionNode, True),
+    "*": (MULTIPLICATIVE, "OPERATOR", TermNode, True),
+    "/": (MULTIPLICATIVE, "OPERATOR", TermNode, True),
+}
+
+
+class TokenList:
+    # Presents a list of (type, text, row, col) tuples through the same
+    # per-field accessors as lexer.TokenBuffer.
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __getitem__(self, index):
+        return self.tokens[index]
+
+    def kind(self, index):
+        return self.tokens[index][0]
+
+    def text(self, index):
+        return self.tokens[index][1]
 
-conditional_operators = {"<", ">", "==", "<=", ">=", "!="}
-logical_operators = {"&", "|"}
+    def location(self, index):
+        token = self.tokens[index]
+        return token[2], token[3]
 
 
 class TokenHelper:
+    # Reads tokens from a TokenBuffer (or a plain token list) one field at a
+    # time, so the parser never needs a whole token tuple. Locations are only
+    # looked up to report errors.
     def __init__(self, tokens):
+        if isinstance(tokens, (list, tuple)):
+            tokens = TokenList(tokens)
         self.tokens = tokens
+        self.count = len(tokens)
         self.position = 0
 
     def peek(self):
-        if self.position < len(self.tokens):
+        if self.position < self.count:
             return self.tokens[self.position]
         return None
 
+    def peek_type(self):
+        if self.position < self.count:
+            return self.tokens.kind(self.position)
+        return None
+
+    def peek_value(self):
+        if self.position < self.count:
+            return self.tokens.text(self.position)
+        return None
+
+    def peek_location(self):
+        if self.position < self.count:
+            return self.tokens.location(self.position)
+        return None
+
     def consume(self, expected_value=None, expected_type=None):
-        if self.position >= len(self.tokens):
+        # Returns the lexeme of the consumed token
+        if self.position >= self.count:
+            raise SyntaxError(f"Error, expected '{expected_value}' but found none")
+        value = self.tokens.text(self.position)
+        if expected_value and value != expected_value:
+            row, col = self.tokens.location(self.position)
+            raise SyntaxError(
+                f"Error, expected '{expected_value}' but found '{value}' at row {row}, column {col}"
+            )
+        if expected_type:
+            token_type = self.tokens.kind(self.position)
+            if token_type != expected_type:
+                row, col = self.tokens.location(self.position)
+                raise SyntaxError(
+                    f"Error, expected {expected_type} but found {token_type} at row {row}, column {col}"
+                )
+        self.position += 1
+        return value
+
+
+class StreamTokenHelper:
+    # TokenHelper over a token iterator (e.g. Tokenizer.tokenize_stream).
+    # Only the single lookahead token the grammar needs is buffered.
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.lookahead = next(self.tokens, None)
+        self.position = 0
+
+    def peek(self):
+        return self.lookahead
+
+    def peek_type(self):
+        return self.lookahead[0] if self.lookahead else None
+
+    def peek_value(self):
+        return self.lookahead[1] if self.lookahead else None
+
+    def peek_location(self):
+        return self.lookahead[2:4] if self.lookahead else None
+
+    def consume(self, expected_value=None, expected_type=None):
+        # Returns the lexeme of the consumed token
+        token = self.lookahead
+        if token is None:
             raise SyntaxError(f"Error, expected '{expected_value}' but found none")
-        token = self.tokens[self.position]
         if expected_value and token[1] != expected_value:
             raise SyntaxError(
                 f"Error, expected '{expected_value}' but found '{token[1]}' at row {token[2]}, column {token[3]}"
@@ -62,52 +170,67 @@ class TokenHelper:
             raise SyntaxError(
                 f"Error, expected {expected_type} but found {token[0]} at row {token[2]}, column {token[3]}"
             )
+        self.lookahead = next(self.tokens, None)
         self.position += 1
-        return token
+        return token[1]
 
 
 class Parser:
 
     def __init__(self, tokens):
-        self.tokens = TokenHelper(tokens)
+        if hasattr(tokens, "__getitem__"):
+            self.tokens = TokenHelper(tokens)
+        else:
+            self.tokens = StreamTokenHelper(tokens)
 
     def parse_program(self):
         # <program> ::= <scope>
         scope = self.parse_scope()
         return ProgramNode(scope)
 
+    def parse_scope_at(self, position):
+        # Parses the scope whose "{" is token number position
+        self.tokens.position = position
+        return self.parse_scope()
+
     def parse_scope(self):
         # <scope> ::= "{" <statement>+ "}"
+        start = self.tokens.position
         self.tokens.consume("{", "SYMBOL")
         statements = []
-        while self.tokens.peek() and self.tokens.peek()[1] != "}":
+        while self.tokens.peek_value() not in (None, "}"):
             statements.append(self.parse_statement())
         self.tokens.consume("}", "SYMBOL")
-        return ScopeNode(statements)  # Reusing ProgramNode for scope
+        node = ScopeNode(statements)  # Reusing ProgramNode for scope
+        node.span = (start, self.tokens.position)
+        return node
 
     def parse_statement(self):
         # <statement> ::= <definer> | <equalize> | <if_structure> | <print> | <while_structure> | <scope>
-        token = self.tokens.peek()
-        if token[1] == "var":
-            return self.parse_definer()
-        elif token[1] == "if":
-            return self.parse_if_structure()
-        elif token[1] == "while":
-            return self.parse_while_structure()
-        elif token[1] == "print":
-            return self.parse_print()
-        elif token[1] == "{":
-            return self.parse_scope()
+        start = self.tokens.position
+        value = self.tokens.peek_value()
+        if value == "var":
+            node = self.parse_definer()
+        elif value == "if":
+            node = self.parse_if_structure()
+        elif value == "while":
+            node = self.parse_while_structure()
+        elif value == "print":
+            node = self.parse_print()
+        elif value == "{":
+            node = self.parse_scope()
         else:
-            return self.parse_equalize()
+            node = self.parse_equalize()
+        node.span = (start, self.tokens.position)
+        return node
 
     def parse_definer(self):
         # <definer>::= ( "var" <type> <var> ";" ) | ( "var" <type> <var> "=" <expression> ";" )
         self.tokens.consume("var", "KEYWORD")
-        var_type = self.tokens.consume(expected_type="TYPE")[1]
-        var_name = self.tokens.consume(expected_type="IDENTIFIER")[1]
+        var_type = self.tokens.consume(expected_type="TYPE")
+        var_name = self.tokens.consume(expected_type="IDENTIFIER")
         value = None
-        if self.tokens.peek() and self.tokens.peek()[1] == "=":
+        if self.tokens.peek_value() == "=":
             self.tokens.consume("=", "SYMBOL")
             value = self.parse_expression()
         self.tokens.consume(";", "SYMBOL")
@@ -115,7 +238,7 @@ class Parser:
 
     def parse_equalize(self):
         # <equalize>::= <var> "=" <expression> ";"
-        var_name = self.tokens.consume(expected_type="IDENTIFIER")[1]
+        var_name = self.tokens.consume(expected_type="IDENTIFIER")
         self.tokens.consume("=", "SYMBOL")
         value = self.parse_expression()
         self.tokens.consume(";", "SYMBOL")
@@ -148,123 +271,67 @@ class Parser:
 
     def parse_condition(self):
         # <condition> ::= <expression> | <expression> <conditional_operator> <expression> | "(" <condition> ")" <logical_operator> "(" <condition> ")"
-        if self.tokens.peek()[1] == "(":
-            self.tokens.consume("(", "SYMBOL")
-            node = self.parse_condition()
-            self.tokens.consume(")", "SYMBOL")
-            while self.tokens.peek() and self.tokens.peek()[1] in logical_operators:
-                operator = self.tokens.consume(expected_type="LOGICAL_OPERATOR")[1]
-                self.tokens.consume("(", "SYMBOL")
-                right = self.parse_condition()
-                self.tokens.consume(")", "SYMBOL")
-                node = ConditionNode(node, operator, right)
-            return node
-        else:
-            left = self.parse_expression()
-            if (
-                not self.tokens.peek()
-                or self.tokens.peek()[1] not in conditional_operators
-            ):
-                return left
-            operator = self.tokens.consume(expected_type="CONDITIONAL_OPERATOR")[1]
-            right = self.parse_expression()
-            return ConditionNode(left, operator, right)
+        if self.tokens.peek_value() == "(":
+            # Only parenthesized conditions combine with logical operators
+            return self.parse_binary(self.parse_condition_group(), LOGICAL, LOGICAL)
+        return self.parse_binary(self.parse_factor(), CONDITIONAL)
 
-    def parse_expression(self):
-        # <expression> ::= <term> (("+" | "-") <term>)*
-        node = self.parse_term()
-        while self.tokens.peek() and self.tokens.peek()[1] in ("+", "-"):
-            operator = self.tokens.consume(expected_type="OPERATOR")[1]
-            right = self.parse_term()
-            node = ExpressionNode(node, operator, right)
+    def parse_condition_group(self):
+        # "(" <condition> ")"
+        self.tokens.consume("(", "SYMBOL")
+        node = self.parse_condition()
+        self.tokens.consume(")", "SYMBOL")
         return node
 
-    def parse_term(self):
+    def parse_expression(self):
+        # <expression> ::= <term> (("+" | "-") <term>)*
         # <term> ::= <factor> (("*" | "/") <factor>)*
-        node = self.parse_factor()
-        while self.tokens.peek() and self.tokens.peek()[1] in ("*", "/"):
-            operator = self.tokens.consume(expected_type="OPERATOR")[1]
-            right = self.parse_factor()
-            node = TermNode(node, operator, right)
-        return node
+        return self.parse_binary(self.parse_factor(), ADDITIVE)
+
+    def parse_binary(self, node, min_precedence, max_precedence=MULTIPLICATIVE):
+        # Precedence climbing over binary_operators: extends the parsed left
+        # operand node with every operator in [min_precedence, max_precedence]
+        # that follows. Right operands only take operators that bind tighter.
+        while True:
+            entry = binary_operators.get(self.tokens.peek_value())
+            if entry is None:
+                return node
+            precedence, token_type, node_type, chains = entry
+            if not min_precedence <= precedence <= max_precedence:
+                return node
+            operator = self.tokens.consume(expected_type=token_type)
+            if precedence == LOGICAL:
+                right = self.parse_condition_group()
+            else:
+                right = self.parse_factor()
+                if precedence < MULTIPLICATIVE:
+                    right = self.parse_binary(right, precedence + 1)
+            node = node_type(node, operator, right)
+            if not chains:
+                return node
 
     def parse_factor(self):
         # <factor> ::= <var> | <signed_number> | "(" <expression> ")"
-        token = self.tokens.peek()
-        if token[1] == "(":
+        token_type = self.tokens.peek_type()
+        if self.tokens.peek_value() == "(":
             self.tokens.consume("(", "SYMBOL")
             node = self.parse_expression()
             self.tokens.consume(")", "SYMBOL")
             return node
-        elif token[0] == "IDENTIFIER":
-            var_name = self.tokens.consume(expected_type="IDENTIFIER")[1]
+        elif token_type == "IDENTIFIER":
+            var_name = self.tokens.consume(expected_type="IDENTIFIER")
             return FactorNode(var_name, is_variable=True)
-        elif token[0] in ("NUMBER", "SIGNED_NUMBER"):
-            number = self.tokens.consume(expected_type=token[0])[1]
+        elif token_type in ("NUMBER", "SIGNED_NUMBER"):
+            number = self.tokens.consume(expected_type=token_type)
             return FactorNode(number, is_variable=False)
-        elif token[0] == "BOOLEAN":
-            boolean = self.tokens.consume(expected_type="BOOLEAN")[1]
+        elif token_type == "BOOLEAN":
+            boolean = self.tokens.consume(expected_type="BOOLEAN")
             return FactorNode(boolean, is_variable=False)
         else:
+            token = self.tokens.peek()
             raise SyntaxError(
                 f"Error, expected '(', 'IDENTIFIER', 'NUMBER', 'SIGNED_NUMBER', or 'BOOLEAN' but found '{token[1]}' at row {token[2]}, column {token[3]}"
             )
 
     def print_ast(self, node, indent=0):
-        prefix = "  " * indent
-
-        if isinstance(node, ProgramNode):
-            print(f"{prefix}Program:")
-            self.print_ast(node.scope, indent + 1)
-
-        if isinstance(node, ScopeNode):
-            print(f"{prefix}Scope:")
-            for stmt in node.statements:
-                self.print_ast(stmt, indent + 1)
-
-        elif isinstance(node, DefinerNode):
-            print(f"{prefix}Definer: var {node.name}", end="")
-            if node.value:
-                print(" =")
-                self.print_ast(node.value, indent + 1)
-            else:
-                print()
-
-        elif isinstance(node, EqualizeNode):
-            print(f"{prefix}Equalize: {node.name} =")
-            self.print_ast(node.value, indent + 1)
-
-        elif isinstance(node, IfNode):
-            print(f"{prefix}If:")
-            self.print_ast(node.condition, indent + 1)
-            self.print_ast(node.scope, indent + 1)
-
-        elif isinstance(node, WhileNode):
-            print(f"{prefix}While:")
-            self.print_ast(node.condition, indent + 1)
-            self.print_ast(node.scope, indent + 1)
-
-        elif isinstance(node, PrintNode):
-            print(f"{prefix}Print:")
-            self.print_ast(node.expression, indent + 1)
-
-        elif isinstance(node, ConditionNode):
-            print(f"{prefix}Condition: {node.operator}")
-            self.print_ast(node.left, indent + 1)
-            self.print_ast(node.right, indent + 1)
-
-        elif isinstance(node, ExpressionNode):
-            print(f"{prefix}Expression: {node.operator}")
-            self.print_ast(node.left, indent + 1)
-            self.print_ast(node.right, indent + 1)
-
-        elif isinstance(node, TermNode):
-            print(f"{prefix}Term: {node.operator}")
-            self.print_ast(node.left, indent + 1)
-            self.print_ast(node.right, indent + 1)
-
-        elif isinstance(node, FactorNode):
-            if node.is_variable:
-                print(f"{prefix}Var: {node.value}")
-            else:
-                print(f"{prefix}Num: {node.value}")
+        ASTPrinter().print(node, indent)
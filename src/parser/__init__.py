@@ -3,10 +3,16 @@ Parser Module
 
 This module contains parsing components:
 - Parser: Syntax analyzer that builds AST
+- IterativeParser: Parser variant that keeps its rule stack on the heap
+- IncrementalParser: Keeps an AST up to date under text edits
+- ASTPrinter: Prints an AST as an indented tree
 - parserNodes: AST node definitions
 """
 
 from .Parser import Parser
+from .IterativeParser import IterativeParser
+from .IncrementalParser import IncrementalParser
+from .ASTPrinter import ASTPrinter
 from .parserNodes import *
 
-__all__ = ['Parser']
\ No newline at end of file
+__all__ = ['Parser', 'IterativeParser', 'IncrementalParser', 'ASTPrinter']
\ No newline at end of file
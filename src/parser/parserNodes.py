@@ -1,47 +1,80 @@
+# Nodes use __slots__ instead of a per-instance __dict__; ASTs of large
+# programs have millions of them.
+#
+# Scope and statement nodes record the tokens they were parsed from in span,
+# as a (first, end) token index range, so an IncrementalParser can tell
+# which subtrees an edit touched.
+
+
 class ProgramNode:
+    __slots__ = ("scope",)
+
     def __init__(self, scope):
         self.scope = scope
 
 
 class ScopeNode:
+    __slots__ = ("statements", "span")
+
     def __init__(self, statements):
         self.statements = statements
+        self.span = None
 
 
 class DefinerNode:
+    __slots__ = ("name", "value", "type", "storage", "scope_id", "slot", "span")
+
     def __init__(self, name, value=None, type=None):
         self.name = name
         self.value = value
         self.type = type
         self.storage = None
         self.scope_id = None
+        self.slot = None
+        self.span = None
+
 
 class EqualizeNode:
+    __slots__ = ("name", "value", "storage", "scope_id", "slot", "span")
+
     def __init__(self, name, value):
         self.name = name
         self.value = value
         self.storage = None
         self.scope_id = None
+        self.slot = None
+        self.span = None
 
 
 class IfNode:
+    __slots__ = ("condition", "scope", "span")
+
     def __init__(self, condition, scope):
         self.condition = condition
         self.scope = scope
+        self.span = None
 
 
 class WhileNode:
+    __slots__ = ("condition", "scope", "span")
+
     def __init__(self, condition, scope):
         self.condition = condition
         self.scope = scope
+        self.span = None
 
 
 class PrintNode:
+    __slots__ = ("expression", "span")
+
     def __init__(self, expression):
         self.expression = expression
+        self.span = None
 
 
 class ConditionNode:
+    __slots__ = ("left", "operator", "right", "type")
+
     def __init__(self, left, operator, right):
         self.left = left
         self.operator = operator
@@ -50,6 +83,8 @@ class ConditionNode:
 
 
 class ExpressionNode:
+    __slots__ = ("left", "operator", "right", "type")
+
     def __init__(self, left, operator, right):
         self.left = left
         self.operator = operator
@@ -58,6 +93,8 @@ class ExpressionNode:
 
 
 class TermNode:
+    __slots__ = ("left", "operator", "right", "type")
+
     def __init__(self, left, operator, right):
         self.left = left
         self.operator = operator
@@ -66,12 +103,15 @@ class TermNode:
 
 
 class FactorNode:
+    __slots__ = ("value", "is_variable", "type", "storage", "scope_id", "slot")
+
     def __init__(self, value, is_variable):
         self.value = value
         self.is_variable = is_variable
         self.type = None
         self.storage = None
         self.scope_id = None
+        self.slot = None
 
     def __repr__(self):
         return f"FactorNode(value={self.value}, is_variable={self.is_variable})"
@@ -0,0 +1,29 @@
+class Visitor:
+    # Base class for the AST walkers. Subclasses define visit_<NodeClass>
+    # methods and call visit(node); generic_visit handles node classes that
+    # have no method.
+    #
+    # Every subclass has its own dispatch table from node class to function,
+    # shared by all its instances. A node class is resolved by name the first
+    # time that subclass sees it, so afterwards dispatching a node is a dict
+    # lookup and a call instead of formatting a method name for getattr.
+    dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.dispatch = {}
+
+    def visit(self, node):
+        method = self.dispatch.get(type(node))
+        if method is None:
+            method = self.resolve(type(node))
+        return method(self, node)
+
+    @classmethod
+    def resolve(cls, node_type):
+        method = getattr(cls, f"visit_{node_type.__name__}", cls.generic_visit)
+        cls.dispatch[node_type] = method
+        return method
+
+    def generic_visit(self, node):
+        raise Exception(f"No visit_{type(node).__name__} method")
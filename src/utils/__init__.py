@@ -2,10 +2,13 @@
 Utilities Module
 
 This module contains utility components:
+- Visitor: Base class for AST walkers with a per-class dispatch table
 - AsmGenerator: Legacy assembly generator
 - CodeGenerator: Legacy code generator
 """
 
+from .Visitor import Visitor
+
 # These are legacy files, may be removed in future versions
 try:
     from .AsmGenerator import AsmGenerator
@@ -17,4 +20,4 @@ try:
 except ImportError:
     CodeGenerator = None
 
-__all__ = ['AsmGenerator', 'CodeGenerator']
\ No newline at end of file
+__all__ = ['Visitor', 'AsmGenerator', 'CodeGenerator']
\ No newline at end of file